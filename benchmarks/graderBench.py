@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import payloads  # noqa: E402
+from python_lib import HXGraders  # noqa: E402
+from python_lib import JSBridge  # noqa: E402
+from python_lib import graderSpecs  # noqa: E402
+from python_lib import matchingIndex  # noqa: E402
+from python_lib import pathwayIndex  # noqa: E402
+from python_lib import stringDistance  # noqa: E402
+
+#######################################################################
+# Throughput and latency benchmarks for every grader.
+# Each case grades a fixed, seeded set of payloads over and over and
+# reports ops/sec, p50/p99 latency and peak traced memory. Results can
+# be saved as a JSON baseline and compared against on a later run:
+#
+#   python benchmarks/graderBench.py --save baseline.json
+#   python benchmarks/graderBench.py --compare baseline.json
+#
+# --compare exits with an error if any case's p50 latency got slower
+# than --max-slowdown times its baseline.
+#
+# Graders that keep compiled problems or distances between calls are
+# run twice. "/uncached" clears those caches before every timed call,
+# so it measures the work itself. "/cached" leaves them warm, the way a
+# long-running worker grading one problem sees them.
+#######################################################################
+
+PAYLOADS_PER_CASE = 20
+
+
+def clearCaches():
+    stringDistance.distance_cache.clear()
+    graderSpecs.spec_cache.clear()
+    graderSpecs.options_cache.clear()
+    pathwayIndex.pathway_cache.clear()
+    matchingIndex.matching_cache.clear()
+
+
+def buildCases(seed=0):
+    rng = payloads.newRandom(seed)
+    cases = []
+
+    def add(name, func, make_args, cached=False):
+        args_list = [make_args() for _ in range(PAYLOADS_PER_CASE)]
+        if cached:
+            cases.append((name + "/uncached", func, args_list, clearCaches))
+            cases.append((name + "/cached", func, args_list, None))
+        else:
+            cases.append((name, func, args_list, None))
+
+    for words in (20, 2000):
+        add(
+            "textResponseGrader/%dw" % words,
+            HXGraders.textResponseGrader,
+            lambda: (payloads.textState(rng, words), {"min_length": 10}),
+        )
+        add(
+            "journalingResponseGrader/%dw" % words,
+            HXGraders.journalingResponseGrader,
+            lambda: (payloads.textState(rng, words), {"min_length": 10}),
+        )
+        add(
+            "multiTextResponseGrader/5x%dw" % words,
+            HXGraders.multiTextResponseGrader,
+            lambda: (
+                payloads.multiTextState(rng, 5, words),
+                {"min_length": 10, "fill_all": True},
+            ),
+        )
+
+    add(
+        "qualtricsSurveyGrader",
+        HXGraders.qualtricsSurveyGrader,
+        lambda: (payloads.qualtricsState(rng), {"survey_length": 10}),
+    )
+
+    for number_times in (10, 1000, 10000):
+        add(
+            "videoWatchGrader/%dt" % number_times,
+            HXGraders.videoWatchGrader,
+            lambda: (payloads.videoState(rng, number_times), "normal"),
+        )
+
+    for groups in (5, 50):
+        add(
+            "pathwayGrader/%dg" % groups,
+            HXGraders.pathwayGrader,
+            lambda: payloads.pathwayProblem(rng, groups, 4),
+            cached=True,
+        )
+
+    for pairs in (5, 50, 200):
+        add(
+            "matchingAGrader/partial/%dp" % pairs,
+            HXGraders.matchingAGrader,
+            lambda: payloads.matchingProblem(rng, pairs) + (True, True),
+            cached=True,
+        )
+        add(
+            "matchingAGrader/exact/%dp" % pairs,
+            HXGraders.matchingAGrader,
+            lambda: payloads.matchingProblem(rng, pairs) + (False, False),
+            cached=True,
+        )
+        add(
+            "matchingWithParticipation/%dp" % pairs,
+            HXGraders.matchingWithParticipation,
+            lambda: payloads.matchingProblem(rng, pairs) + (True, True, 0.2),
+            cached=True,
+        )
+
+    for items in (3, 10, 30, 100):
+        add(
+            "orderGrader/%di" % items,
+            HXGraders.orderGrader,
+            lambda: payloads.orderProblem(rng, items),
+            cached=True,
+        )
+        add(
+            "levenshtein/%di" % items,
+            HXGraders.levenshtein,
+            lambda: tuple(payloads.orderProblem(rng, items)[1][:2]),
+            cached=True,
+        )
+
+    for problem_type in ("interval", "number"):
+        add(
+            "rangeGuessGrader/" + problem_type,
+            HXGraders.rangeGuessGrader,
+            lambda: payloads.rangeGuessProblem(rng, problem_type),
+            cached=True,
+        )
+        add(
+            "getRangeGuesserParams/" + problem_type,
+            HXGraders.getRangeGuesserParams,
+            lambda: (payloads.rangeGuessProblem(rng, problem_type)[1],),
+        )
+
+    add("JSBridge.insertJavascript", JSBridge.insertJavascript, lambda: ())
+    add("JSBridge.JSAlert", JSBridge.JSAlert, lambda: (rng.randint(0, 1000),))
+    return cases
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+# clear, if given, is called before every call, outside the timing.
+def runCase(func, args_list, min_time=0.5, min_calls=50, clear=None):
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    while len(latencies) < min_calls or clock() - started < min_time:
+        for args in args_list:
+            if clear is not None:
+                clear()
+            start = clock()
+            func(*args)
+            latencies.append(clock() - start)
+    total = sum(latencies)
+    latencies.sort()
+
+    # Memory is measured on a separate pass, since tracing slows things down.
+    tracemalloc.start()
+    for args in args_list:
+        if clear is not None:
+            clear()
+        func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else float("inf"),
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "peak_kib": peak / 1024.0,
+    }
+
+
+def compareResults(results, baseline, max_slowdown):
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]["p50_us"]
+        ratio = result["p50_us"] / before if before else 1.0
+        flag = ""
+        if ratio > max_slowdown:
+            flag = "  SLOWER"
+            regressions.append(name)
+        print("%-40s p50 x%.2f%s" % (name, ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HX graders.")
+    parser.add_argument("--filter", default="", help="Only run cases with this text")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline")
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(
+        "%-40s %12s %10s %10s %10s"
+        % ("case", "ops/sec", "p50 us", "p99 us", "peak KiB")
+    )
+    for name, func, args_list, clear in buildCases(args.seed):
+        if args.filter not in name:
+            continue
+        result = runCase(func, args_list, args.min_time, clear=clear)
+        results[name] = result
+        print(
+            "%-40s %12.0f %10.1f %10.1f %10.1f"
+            % (
+                name,
+                result["ops_per_sec"],
+                result["p50_us"],
+                result["p99_us"],
+                result["peak_kib"],
+            )
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "seed": args.seed,
+                    "results": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compareResults(results, baseline, args.max_slowdown):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+#######################################################################
+# Cold import-time check for python_lib.
+# Every sandboxed grading run imports the grader module from scratch,
+# so this starts a fresh interpreter for each sample, times the import,
+# and fails (exit code 1) if the median goes over the budget or if any
+# forbidden heavy module (numpy by default) got loaded along the way.
+#
+#   python benchmarks/importTime.py --budget-ms 40
+#######################################################################
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def measureImport(module, samples=15, python=sys.executable, preload_json=True):
+    probe = PROBE % module
+    if not preload_json:
+        probe = probe.replace("import sys, time, json", "import sys, time")
+        probe = probe.replace("print(json.dumps(", "import json\nprint(json.dumps(")
+    times = []
+    modules = set()
+    for _ in range(samples):
+        output = subprocess.check_output([python, "-c", probe], cwd=REPO_ROOT)
+        result = json.loads(output)
+        times.append(result["seconds"])
+        modules.update(result["modules"])
+    times.sort()
+    return {
+        "module": module,
+        "samples": samples,
+        "median_ms": statistics.median(times) * 1000.0,
+        "min_ms": times[0] * 1000.0,
+        "max_ms": times[-1] * 1000.0,
+        "modules": modules,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check the cold import time of a python_lib module."
+    )
+    parser.add_argument("--module", default="python_lib.HXGraders")
+    parser.add_argument("--budget-ms", type=float, default=40.0)
+    parser.add_argument("--samples", type=int, default=15)
+    parser.add_argument(
+        "--forbid",
+        action="append",
+        default=None,
+        help="Module that must not be imported (default: numpy)",
+    )
+    parser.add_argument(
+        "--count-json",
+        action="store_true",
+        help="Include the cost of importing json (normally already loaded)",
+    )
+    args = parser.parse_args(argv)
+    forbidden = args.forbid or ["numpy"]
+
+    result = measureImport(args.module, args.samples, preload_json=not args.count_json)
+    loaded = sorted(
+        m
+        for m in forbidden
+        if any(x == m or x.startswith(m + ".") for x in result["modules"])
+    )
+
+    print(
+        "%s: median %.2f ms (min %.2f, max %.2f) over %d runs, budget %.2f ms"
+        % (
+            result["module"],
+            result["median_ms"],
+            result["min_ms"],
+            result["max_ms"],
+            result["samples"],
+            args.budget_ms,
+        )
+    )
+
+    failed = False
+    if result["median_ms"] > args.budget_ms:
+        print("FAIL: import time is over budget.")
+        failed = True
+    if loaded:
+        print("FAIL: forbidden modules were imported: " + ", ".join(loaded))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
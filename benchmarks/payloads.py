@@ -0,0 +1,151 @@
+import json
+import random
+import string
+
+#######################################################################
+# Seeded generators for realistic grader inputs.
+# Every problem state edX hands a grader is double-encoded: a JSON
+# object whose "answer" value is another JSON string. These helpers
+# build that shape at different sizes so the benchmarks (and anything
+# else that needs sample data) can grade the same inputs every run.
+#######################################################################
+
+WORDS = (
+    "the learner wrote about evidence history policy method result "
+    "argument reading course example question because however data "
+    "model theory practice source context change people research"
+).split()
+
+
+def encodeState(answer):
+    return json.dumps({"answer": json.dumps(answer)})
+
+
+def essay(rng, number_words):
+    return " ".join(rng.choice(WORDS) for _ in range(number_words))
+
+
+def textState(rng, number_words):
+    return encodeState({"answer": '"' + essay(rng, number_words) + '" '})
+
+
+def multiTextState(rng, number_answers, number_words):
+    return encodeState(
+        {"answers": [essay(rng, number_words) for _ in range(number_answers)]}
+    )
+
+
+def qualtricsState(rng):
+    return encodeState({"score": rng.randint(0, 10)})
+
+
+# Heartbeats every second or so, with a few skips and rewatches.
+def videoState(rng, number_times):
+    times = []
+    t = 0.0
+    while len(times) < number_times:
+        if rng.random() < 0.02:
+            t += rng.randint(5, 60)
+        elif rng.random() < 0.01:
+            t = max(0.0, t - rng.randint(5, 30))
+        times.append(round(t, 1))
+        t += rng.choice([0.5, 1.0, 1.0, 1.5])
+    video_length = max(times) + 10
+    return encodeState(
+        {"video_length": video_length, "watch_times": times, "start_time": 0}
+    )
+
+
+def pathwayProblem(rng, number_groups, choices_per_group):
+    points_lookup = {"final_total": number_groups * 3}
+    choice = 0
+    for g in range(number_groups):
+        group = {}
+        for _ in range(choices_per_group):
+            group[str(choice)] = rng.choice([-1, 0, 1, 2, 3])
+            choice += 1
+        points_lookup["group" + str(g)] = group
+    all_choices = [str(c) for c in range(choice)]
+    ans = encodeState(
+        {
+            "ever_opened": rng.sample(all_choices, len(all_choices) // 2),
+            "currently_open": rng.sample(all_choices, number_groups),
+        }
+    )
+    return ans, points_lookup
+
+
+def _pairing(rng, number_pairs):
+    return [[string.ascii_lowercase[i % 26] + str(i), i] for i in range(number_pairs)]
+
+
+# Returns (ans, right_answer) with a few accepted variants and a
+# learner answer that gets most of the pairings right.
+def matchingProblem(rng, number_pairs, number_variants=3):
+    right = _pairing(rng, number_pairs)
+    variants = []
+    for _ in range(number_variants):
+        variant = [list(p) for p in right]
+        for p in rng.sample(variant, max(1, number_pairs // 10)):
+            p[1] = rng.randint(0, number_pairs)
+        variants.append(variant)
+    answer = [list(p) for p in right]
+    for p in rng.sample(answer, max(1, number_pairs // 5)):
+        p[1] = rng.randint(0, number_pairs)
+    rng.shuffle(answer)
+    return encodeState({"pairings": answer}), variants
+
+
+def orderItems(number_items):
+    if number_items <= 26:
+        return string.ascii_lowercase[:number_items]
+    # Caseless characters, so lower() in the grader leaves them alone.
+    return "".join(chr(0x4E00 + i) for i in range(number_items))
+
+
+# Returns (ans, right_answer): the learner's order is the right order
+# with a few neighbouring items swapped.
+def orderProblem(rng, number_items, number_variants=3):
+    items = list(orderItems(number_items))
+    variants = ["".join(items)]
+    for _ in range(number_variants - 1):
+        variant = list(items)
+        i = rng.randrange(number_items - 1)
+        variant[i], variant[i + 1] = variant[i + 1], variant[i]
+        variants.append("".join(variant))
+    answer = list(items)
+    for _ in range(max(1, number_items // 10)):
+        i = rng.randrange(number_items - 1)
+        answer[i], answer[i + 1] = answer[i + 1], answer[i]
+    pairings = [[x, i] for i, x in enumerate(answer)]
+    rng.shuffle(pairings)
+    return encodeState({"pairings": pairings}), variants
+
+
+def rangeGuessProblem(rng, problem_type):
+    options = {
+        "problem_type": problem_type,
+        "correct_interval": [40, 60],
+        "interval_tolerance": rng.choice(["strict", "normal", "generous"]),
+        "show_open_close": True,
+        "interval_type": ["closed", "open"],
+        "type_penalty": 0.1,
+        "correct_number": 50,
+        "tolerance": [2, 5, 10],
+        "brackets": [1, 0.75, 0.5, 0],
+        "feedback": True,
+    }
+    lower = rng.randint(30, 55)
+    ans = encodeState(
+        {
+            "lowerguess": lower,
+            "upperguess": lower + rng.randint(1, 20),
+            "lowerclosed": rng.random() < 0.5,
+            "upperclosed": rng.random() < 0.5,
+        }
+    )
+    return ans, options
+
+
+def newRandom(seed=0):
+    return random.Random(seed)
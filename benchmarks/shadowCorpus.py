@@ -0,0 +1,133 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import payloads  # noqa: E402
+
+#######################################################################
+# Generated corpus for shadow runs.
+# Writes seeded grader calls in the JSONL shape python_lib.shadowGrading
+# reads, covering every grader at small and large sizes along with the
+# edge cases the originals are fussy about (blank and quoted answers,
+# one-item orders, ranges outside the answer):
+#
+#   python benchmarks/shadowCorpus.py corpus.jsonl.gz --rounds 200
+#   python -m python_lib.shadowGrading corpus.jsonl.gz
+#######################################################################
+
+EDGE_TEXTS = ("", " ", '""', '"  x  "', "short", "a" * 9, "a" * 10, "  padded   ")
+
+
+def corpusRound(rng):
+    state = payloads.encodeState
+    calls = []
+
+    def add(grader, args, ans=None):
+        call = {"grader": grader, "args": list(args)}
+        if ans is not None:
+            call["ans"] = ans
+        calls.append(call)
+
+    for words in (0, 3, 200):
+        text = payloads.essay(rng, words)
+        edge = rng.choice(EDGE_TEXTS)
+        min_length = rng.choice([0, 5, 10, 40])
+        for answer in (text, edge):
+            add(
+                "textResponseGrader",
+                [{"min_length": min_length}],
+                state({"answer": answer}),
+            )
+            add(
+                "journalingResponseGrader",
+                [{"min_length": min_length}],
+                state({"answer": answer}),
+            )
+        answers = [rng.choice((text, edge)) for _ in range(rng.randint(1, 5))]
+        add(
+            "multiTextResponseGrader",
+            [{"min_length": min_length, "fill_all": rng.random() < 0.5}],
+            state({"answers": answers}),
+        )
+
+    add(
+        "qualtricsSurveyGrader",
+        [{"survey_length": rng.randint(1, 10)}],
+        state({"score": rng.choice([0, 3, 5.5, "7", 10])}),
+    )
+
+    for number_times in (20, 2000):
+        add(
+            "videoWatchGrader",
+            [rng.choice(["strict", "normal", "generous"])],
+            payloads.videoState(rng, number_times),
+        )
+
+    for groups in (3, 30):
+        ans, points_lookup = payloads.pathwayProblem(rng, groups, 4)
+        options = {
+            "show_points": rng.random() < 0.5,
+            "grade_on": rng.choice(["score", "exploration", "participation"]),
+            "retain_negative": rng.random() < 0.5,
+        }
+        add("pathwayGrader", [points_lookup, options], ans)
+
+    for pairs in (1, 5, 60):
+        ans, right = payloads.matchingProblem(rng, pairs)
+        partial, feedback = rng.random() < 0.5, rng.random() < 0.5
+        add("matchingAGrader", [right, partial, feedback], ans)
+        add(
+            "matchingWithParticipation",
+            [right, partial, feedback, rng.choice([0, 0.2, 0.5])],
+            ans,
+        )
+
+    for items in (1, 2, 8, 40):
+        if items == 1:
+            ans = state({"pairings": [["a", 0]]})
+            right = ["a", "ab"]
+        else:
+            ans, right = payloads.orderProblem(rng, items)
+        options = {
+            "partial_credit": rng.random() < 0.5,
+            "feedback": rng.random() < 0.5,
+            "all_correct": rng.random() < 0.1,
+        }
+        add("orderGrader", [right, options], ans)
+        if items > 1:
+            add("levenshtein", right[:2])
+
+    for problem_type in ("interval", "number"):
+        ans, options = payloads.rangeGuessProblem(rng, problem_type)
+        add("rangeGuessGrader", [options], ans)
+        add("getRangeGuesserParams", [options])
+    return calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a shadow-run corpus.")
+    parser.add_argument("output", help="Output .jsonl or .jsonl.gz file")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = payloads.newRandom(args.seed)
+    opener = gzip.open if args.output.endswith(".gz") else open
+    count = 0
+    with opener(args.output, "wt", encoding="utf-8") as f:
+        for _ in range(args.rounds):
+            for call in corpusRound(rng):
+                call["id"] = count
+                f.write(json.dumps(call) + "\n")
+                count += 1
+    print("wrote %d calls to %s" % (count, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
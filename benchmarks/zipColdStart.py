@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import buildZip  # noqa: E402
+import payloads  # noqa: E402
+
+#######################################################################
+# Cold-start comparison: python_lib.zip vs the source tree.
+# A sandboxed grading run starts a new interpreter, imports the graders
+# from the course's zip and grades one submission, without a writable
+# __pycache__ to keep bytecode in. This times exactly that, in a fresh
+# process per sample, for each grader below: the import, the first
+# grade, and the two together.
+#
+# The source tree is run with bytecode caching pointed at an empty
+# directory, so it pays the same compile cost the sandbox would. The
+# zip is built from the current tree with buildZip unless --zip is
+# given; pass --zip more than once to compare several builds.
+#
+#   python benchmarks/zipColdStart.py
+#   python benchmarks/zipColdStart.py --zip python_lib.zip --zip new.zip
+#######################################################################
+
+PROBE = """
+import json, sys, time
+path, grader, args = json.loads(sys.stdin.read())
+sys.path.insert(0, path)
+clock = time.perf_counter
+start = clock()
+from python_lib import HXGraders
+imported = clock()
+getattr(HXGraders, grader)(*args)
+graded = clock()
+print(json.dumps([imported - start, graded - imported]))
+"""
+
+
+def buildProbes(seed=0):
+    rng = payloads.newRandom(seed)
+    return [
+        ("textResponseGrader", [payloads.textState(rng, 200), {"min_length": 10}]),
+        ("videoWatchGrader", [payloads.videoState(rng, 1000), "normal"]),
+        ("pathwayGrader", list(payloads.pathwayProblem(rng, 10, 4))),
+        (
+            "matchingAGrader",
+            list(payloads.matchingProblem(rng, 20)) + [True, True],
+        ),
+        ("orderGrader", list(payloads.orderProblem(rng, 10))),
+    ]
+
+
+def measureTarget(path, grader, args, samples, python, env):
+    request = json.dumps([path, grader, args])
+    imports = []
+    grades = []
+    for _ in range(samples):
+        output = subprocess.run(
+            [python, "-c", PROBE],
+            input=request,
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=tempfile.gettempdir(),
+            env=env,
+        ).stdout
+        import_seconds, grade_seconds = json.loads(output)
+        imports.append(import_seconds * 1000.0)
+        grades.append(grade_seconds * 1000.0)
+    totals = [i + g for i, g in zip(imports, grades)]
+    return {
+        "import_ms": statistics.median(imports),
+        "first_grade_ms": statistics.median(grades),
+        "total_ms": statistics.median(totals),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare cold import + first grade from python_lib.zip and the source tree."
+    )
+    parser.add_argument(
+        "--zip",
+        action="append",
+        default=None,
+        help="Zip to measure (default: build one from this tree)",
+    )
+    parser.add_argument("--python", default=sys.executable)
+    parser.add_argument("--samples", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--filter", default="", help="Only run graders containing this")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="hxpy-coldstart-")
+    try:
+        zips = args.zip
+        if not zips:
+            zips = [os.path.join(work_dir, "python_lib.zip")]
+            buildZip.buildZip(zips[0], args.python)
+
+        # An empty, throwaway cache prefix means the source tree never
+        # finds bytecode from an earlier run, just like the sandbox.
+        env = dict(os.environ)
+        env.pop("PYTHONPATH", None)
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        env["PYTHONPYCACHEPREFIX"] = os.path.join(work_dir, "pycache")
+
+        targets = [("source", REPO_ROOT)]
+        targets += [(os.path.basename(z), os.path.abspath(z)) for z in zips]
+
+        print(
+            "%-20s %-20s %10s %12s %10s"
+            % ("grader", "target", "import ms", "1st grade ms", "total ms")
+        )
+        for grader, grader_args in buildProbes(args.seed):
+            if args.filter not in grader:
+                continue
+            baseline = None
+            for label, path in targets:
+                result = measureTarget(
+                    path, grader, grader_args, args.samples, args.python, env
+                )
+                if baseline is None:
+                    baseline = result["total_ms"]
+                    ratio = ""
+                else:
+                    ratio = "  (%.2fx)" % (result["total_ms"] / baseline)
+                print(
+                    "%-20s %-20s %10.2f %12.2f %10.2f%s"
+                    % (
+                        grader,
+                        label,
+                        result["import_ms"],
+                        result["first_grade_ms"],
+                        result["total_ms"],
+                        ratio,
+                    )
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
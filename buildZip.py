@@ -0,0 +1,220 @@
+import argparse
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+#######################################################################
+# Builds python_lib.zip for upload to a course's Files & Uploads.
+# Only the modules the graders actually import are packed (the batch,
+# cache and numpy cohort tools are offline-only and stay out), each one
+# precompiled for the target interpreter so a sandboxed grading run
+# doesn't have to recompile HXGraders on every submission.
+#
+# Bytecode is written as unchecked hash-based .pyc files (PEP 552), so
+# zipimport uses it without looking at timestamps. The matching .py is
+# kept next to it as a fallback: if the course's Python turns out to be
+# a different version, zipimport rejects the .pyc's magic number and
+# compiles the source instead. Pass --bytecode-only when you know the
+# target interpreter exactly and want the smallest zip.
+#
+# Entries are sorted and stamped with a fixed date (SOURCE_DATE_EPOCH if
+# set), so the same tree and interpreter always give a byte-identical
+# zip.
+#
+#   python buildZip.py
+#   python buildZip.py --python /usr/bin/python3.8 --output dist/python_lib.zip
+#######################################################################
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = "python_lib"
+ENTRY_MODULES = ("__init__", "HXGraders", "JSBridge", "simpleFunctions")
+DEFAULT_DATE = (1980, 1, 1, 0, 0, 0)
+
+IMPORT_PATTERN = re.compile(r"^\s*from \.(\w*) import ([\w, ]+)", re.MULTILINE)
+
+COMPILE_SCRIPT = """
+import json, py_compile, sys
+jobs, optimize = json.loads(sys.stdin.read())
+for source, target, display in jobs:
+    py_compile.compile(
+        source,
+        cfile=target,
+        dfile=display,
+        doraise=True,
+        optimize=optimize,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+print(json.dumps(sys.version_info[:3]))
+"""
+
+SMOKE_SCRIPT = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from python_lib import HXGraders, JSBridge, simpleFunctions
+state = json.dumps({"pairings": [["b", 0], ["a", 1]]})
+result = HXGraders.orderGrader(json.dumps({"answer": state}), ["ab"])
+assert "input_list" in result, result
+assert HXGraders.__spec__.origin.startswith(sys.argv[1]), HXGraders.__spec__.origin
+"""
+
+
+def findModules(package_dir=None, entries=ENTRY_MODULES):
+    # Follows "from . import x" and "from .x import y" out from the entry
+    # modules, including the ones imported lazily inside graders.
+    package_dir = package_dir or os.path.join(REPO_ROOT, PACKAGE)
+    found = set()
+    pending = list(entries)
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        path = os.path.join(package_dir, name + ".py")
+        if not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, encoding="utf-8") as source:
+            text = source.read()
+        for module, names in IMPORT_PATTERN.findall(text):
+            if module:
+                pending.append(module)
+            else:
+                pending.extend(n.strip() for n in names.split(",") if n.strip())
+    return sorted(found)
+
+
+def compileModules(modules, package_dir, python, optimize):
+    # Compiles with the target interpreter itself so the bytecode has its
+    # magic number, then returns {module name: .pyc bytes}.
+    work_dir = tempfile.mkdtemp(prefix="hxpy-build-")
+    try:
+        jobs = [
+            [
+                os.path.join(package_dir, name + ".py"),
+                os.path.join(work_dir, name + ".pyc"),
+                PACKAGE + "/" + name + ".py",
+            ]
+            for name in modules
+        ]
+        output = subprocess.run(
+            [python, "-c", COMPILE_SCRIPT],
+            input=json.dumps([jobs, optimize]),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        version = tuple(json.loads(output))
+        bytecode = {}
+        for name in modules:
+            with open(os.path.join(work_dir, name + ".pyc"), "rb") as compiled:
+                bytecode[name] = compiled.read()
+        return bytecode, version
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def buildDate():
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return DEFAULT_DATE
+    import time
+
+    # Zip dates can't go before 1980.
+    stamp = time.gmtime(max(int(epoch), 315532800))
+    return stamp[:6]
+
+
+def addEntry(archive, name, data, date):
+    info = zipfile.ZipInfo(name, date_time=date)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    info.create_system = 3
+    archive.writestr(info, data, compresslevel=9)
+
+
+def buildZip(
+    output,
+    python=sys.executable,
+    bytecode_only=False,
+    optimize=0,
+    package_dir=None,
+):
+    package_dir = package_dir or os.path.join(REPO_ROOT, PACKAGE)
+    modules = findModules(package_dir)
+    bytecode, version = compileModules(modules, package_dir, python, optimize)
+    date = buildDate()
+
+    entries = []
+    for name in modules:
+        entries.append((PACKAGE + "/" + name + ".pyc", bytecode[name]))
+        if not bytecode_only:
+            with open(os.path.join(package_dir, name + ".py"), "rb") as source:
+                entries.append((PACKAGE + "/" + name + ".py", source.read()))
+    entries.sort()
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries:
+            addEntry(archive, name, data, date)
+    with open(output, "wb") as out:
+        out.write(buffer.getvalue())
+
+    return {
+        "output": output,
+        "modules": modules,
+        "python": "%d.%d.%d" % version,
+        "bytecode_only": bytecode_only,
+        "bytes": len(buffer.getvalue()),
+    }
+
+
+def smokeTest(output, python=sys.executable):
+    # Imports the graders from the new zip in a fresh interpreter and runs
+    # one grade, so a broken build fails here rather than in a course.
+    subprocess.run(
+        [python, "-I", "-c", SMOKE_SCRIPT, os.path.abspath(output)], check=True
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a precompiled python_lib.zip for course uploads."
+    )
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, PACKAGE + ".zip"))
+    parser.add_argument(
+        "--python",
+        default=sys.executable,
+        help="Interpreter to compile for (default: this one)",
+    )
+    parser.add_argument(
+        "--bytecode-only",
+        action="store_true",
+        help="Leave out the .py fallbacks; only safe if --python matches the course's Python exactly",
+    )
+    parser.add_argument("--optimize", type=int, choices=(0, 1, 2), default=0)
+    parser.add_argument("--skip-check", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = buildZip(args.output, args.python, args.bytecode_only, args.optimize)
+    if not args.skip_check:
+        smokeTest(args.output, args.python)
+    print(
+        "%s: %d modules, %d bytes, bytecode for Python %s%s"
+        % (
+            result["output"],
+            len(result["modules"]),
+            result["bytes"],
+            result["python"],
+            " (no source fallback)" if result["bytecode_only"] else "",
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,649 +1,495 @@
-import json
 import math
-import random
-from numpy import median
 
+from . import gradeBrackets
+from . import gradeResult
+from . import graderMetrics
+from . import payloadGuards
+from . import stateDecoder
+from .gradeResult import GradeResult
+
+# Helpers that only some graders use (textValidation, watchIntervals,
+# pathwayIndex and so on) are imported inside those graders, so a
+# problem only loads what its own grader needs.
+#
+# pathwayGrader and matchingAGrader compile their answer key once per
+# problem and cache it; see pathwayIndex and matchingIndex. Passing in
+# an already compiled key skips even the cache lookup.
+
+# graderSpecs imports this module, so it's loaded by the first grader
+# that needs it. Kept here after that, since those graders are called
+# often enough that even a repeated import statement shows up.
+graderSpecs = None
+
+
+def _graderSpecs():
+    global graderSpecs
+    from . import graderSpecs
+
+    return graderSpecs
+
+
+# Every grader is wrapped with this. It always counts calls; if
+# graderMetrics.enable() has been called it also records timings,
+# payload sizes and outcomes. See graderMetrics.py.
+# States over a payloadGuards limit get a zero grade and a message
+# instead of being graded.
+# Graders build a compact GradeResult, which is turned into the usual
+# edX dict here unless the caller passed compact=True.
+def call_counter(func):
+    def helper(*args, compact=False, **kwargs):
+        helper.calls += 1
+        try:
+            if not graderMetrics.enabled:
+                result = func(*args, **kwargs)
+            else:
+                result = graderMetrics.measure(helper.__name__, func, args, kwargs)
+        except payloadGuards.PayloadRejected as e:
+            result = payloadGuards.rejectedResult(helper.__name__, e)
+        if compact or type(result) is not GradeResult:
+            return result
+        return result.toEdX()
+
+    helper.calls = 0
+    helper.__name__ = func.__name__
+    helper.__qualname__ = func.__qualname__
+    helper.__doc__ = func.__doc__
+    # The grader itself, for graders that build on another one.
+    helper.__wrapped__ = func
+    return helper
 
+
+@call_counter
 def multiTextResponseGrader(ans, new_options={"min_length": 0, "fill_all": False}):
 
-    options = {"min_length": 0, "fill_all": False}
+    from . import textValidation
+
+    options = {"min_length": 0, "fill_all": False, "min_words": 0, "min_letters": 0}
     options.update(new_options)
 
     # Parse the state and obtain the "answer" string from it.
-    parsed = json.loads(ans)
-    answers = json.loads(parsed["answer"])["answers"]
-
-    # Remove quotes and whitespace from the ends.
-    for a in answers:
-        a = a.strip('"')
-        a = a.strip('"')
-        a = a.strip()
-
-    correctness = True
-    message = "Your input has been accepted."
-    grade = 0.5
+    (answers,) = stateDecoder.decodeFields(
+        ans, ("answers", list), grader="multiTextResponseGrader"
+    )
 
-    # Check for sufficient length. 
+    # Check for sufficient length and for blank answers, in one pass.
     # If fill_all is false, only one answer needs to be long enough.
-    if options["fill_all"]:
-        for a in answers:
-            if len(a) < options["min_length"]:
-                correctness = False
-    else:
-        correctness = False
-        for a in answers:
-            if len(a) >= options["min_length"]:
-                correctness = True
-                break
-
-    if not correctness:
-            message = "One of your responses is too short. Please try again."
-            grade = 0
-
+    problem = textValidation.checkAnswers(
+        answers,
+        options["min_length"],
+        options["fill_all"],
+        options["min_words"],
+        options["min_letters"],
+    )
 
-    # Check for blank answers.
-    if options["fill_all"]:
-        for a in answers:
-            if len(a) == 0:
-                correctness = False
-                message = "One of your responses is blank. Please try again."
-                grade = 0
+    if problem == "blank":
+        return GradeResult(False, 0, gradeResult.ONE_BLANK)
+    elif problem == "short":
+        return GradeResult(False, 0, gradeResult.ONE_TOO_SHORT)
 
     # If none of the above conditions fail, everything's good.
-    if correctness:
-        grade = 1
-
-    return {"input_list": [{"ok": correctness, "msg": message, "grade_decimal": grade}]}
+    return GradeResult(True, 1, gradeResult.ACCEPTED)
 
 
+@call_counter
 def journalingResponseGrader(ans, new_options={"min_length": 10}):
 
     options = {"min_length": 10}
     options.update(new_options)
 
     # Parse the state and obtain the "answer" string from it.
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])["answer"]
+    (answer,) = stateDecoder.decodeFields(
+        ans,
+        ("answer", None),
+        grader="journalingResponseGrader",
+        keep=options["min_length"],
+    )
     length = len(answer)
 
     # Checking for sufficient length.
     if length >= options["min_length"]:
-        return {
-            "input_list": [
-                {"ok": True, "msg": "Thank you for your response.", "grade_decimal": 1}
-            ]
-        }
+        return GradeResult(True, 1, gradeResult.THANKS)
     else:
-        return {
-            "input_list": [
-                {
-                    "ok": False,
-                    "msg": "Your response is too short. Please try again.",
-                    "grade_decimal": 0,
-                }
-            ]
-        }
+        return GradeResult(False, 0, gradeResult.TOO_SHORT)
 
 
+@call_counter
 def pathwayGrader(
     ans,
     points_lookup,
     new_options={"show_points": True, "grade_on": "score", "retain_negative": True},
 ):
 
-    options = {"show_points": True, "grade_on": "score", "retain_negative": True}
+    options = {
+        "show_points": True,
+        "grade_on": "score",
+        "retain_negative": True,
+        "score_brackets": None,
+    }
     options.update(new_options)
 
-    total_score = 0
-    number_groups = 0
+    from . import pathwayIndex
 
     # Get the student's answer.
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])
-    max_score = points_lookup["final_total"]
-
-    # Get total number of points from opened boxes.
-    # Take the highest positive points from any set.
-    # If we retain_negative, then negative points always subtract.
-    for group in points_lookup:
-        minus_points = 0
-        plus_points = 0
-        if type(points_lookup[group]) is dict:
-            number_groups += 1
-            for choice in points_lookup[group]:
-                p = int(points_lookup[group][choice])
-                if (
-                    str(choice) in answer["ever_opened"]
-                    and p < 0
-                    and options["retain_negative"]
-                ):
-                    minus_points += int(p)
-                if options["grade_on"] == "exploration":
-                    if str(choice) in answer["ever_opened"] and p > 0:
-                        plus_points = max(plus_points, p)
-                else:
-                    if str(choice) in answer["currently_open"] and p > 0:
-                        plus_points = max(plus_points, p)
-
-        # Divide by final total to get overall score.
-        total_score = total_score + plus_points + minus_points
-
-    if options["grade_on"] == "score" or options["grade_on"] == "exploration":
-        # Make sure we don't go negative or over 100%.
-        raw_score = float(total_score) / float(max_score)
-        grade_decimal = median([0, raw_score, 1])
-
-    elif options["grade_on"] == "participation":
-        # Grade on how many options they have open instead.
-        grade_decimal = float(len(answer["currently_open"])) / float(number_groups)
-
-    if grade_decimal > 0.7:
-        isOK = True
-    elif grade_decimal > 0.2:
-        isOK = "Partial"
-    else:
-        isOK = False
+    ever_opened, currently_open = stateDecoder.decodeFields(
+        ans,
+        ("ever_opened", list),
+        ("currently_open", list),
+        grader="pathwayGrader",
+    )
 
-    msg = ""
-    if options["show_points"]:
-        msg = "Saved Score: " + str(total_score) + " points out of " + str(max_score)
+    index = pathwayIndex.compilePathway(points_lookup)
+    isOK, grade_decimal, total_score = index.grade(ever_opened, currently_open, options)
 
-    return {"ok": isOK, "msg": msg, "grade_decimal": grade_decimal}
+    if options["show_points"]:
+        return GradeResult(
+            isOK,
+            grade_decimal,
+            gradeResult.PATHWAY_SCORE,
+            (total_score, index.final_total),
+            flat=True,
+        )
+    return GradeResult(isOK, grade_decimal, flat=True)
 
 
+@call_counter
 def qualtricsSurveyGrader(ans, new_options={"survey_length": 1}):
 
-    # Currently there are no options used in this problem type.
-    options = {"survey_length": 1}
+    options = {"survey_length": 1, "score_brackets": None}
     options.update(new_options)
 
     # Get the student's answer.
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])
+    (score,) = stateDecoder.decodeFields(
+        ans, ("score", None), grader="qualtricsSurveyGrader"
+    )
     try:
-        raw_score = float(answer["score"])
+        raw_score = float(score)
     except ValueError:
         raw_score = 0.0
 
     grade = raw_score / float(options["survey_length"])
 
-    if grade > 0.76:
-        isOK = True
-        grade = 1.0
-    elif grade > 0.51:
-        isOK = "Partial"
-        grade = 0.75
-    elif grade > 0.26:
-        isOK = "Partial"
-        grade = 0.5
-    elif grade > 0.05:
-        isOK = "Partial"
-        grade = 0.25
-    else:
-        isOK = False
+    # Round to the nearest quarter, with generous cutoffs.
+    brackets = gradeBrackets.compileBrackets(
+        options["score_brackets"], gradeBrackets.QUALTRICS
+    )
+    isOK, grade = brackets.score(grade)
 
-    return {"input_list": [{"ok": isOK, "msg": "", "grade_decimal": grade}]}
+    return GradeResult(isOK, grade)
 
 
+@call_counter
 def textResponseGrader(ans, new_options={"min_length": 10}):
 
-    options = {"min_length": 10}
-    options.update(new_options)
+    from . import textValidation
 
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])["answer"]
+    options = {"min_length": 10, "min_words": 0, "min_letters": 0}
+    options.update(new_options)
 
-    # Remove quotes and whitespace from the ends.
-    answer = answer.strip('"')
-    answer = answer.strip('"')
-    answer = answer.strip()
+    # An answer cut down to its payload limit is never cut below min_length.
+    (answer,) = stateDecoder.decodeFields(
+        ans, ("answer", str), grader="textResponseGrader", keep=options["min_length"]
+    )
 
-    if len(answer) >= options["min_length"]:
-        return {
-            "input_list": [
-                {"ok": True, "msg": "Thank you for your response.", "grade_decimal": 1}
-            ]
-        }
+    # Quotes and whitespace at the ends don't count toward the length.
+    if textValidation.meetsMinimums(
+        answer, options["min_length"], options["min_words"], options["min_letters"]
+    ):
+        return GradeResult(True, 1, gradeResult.THANKS)
     else:
-        return {
-            "input_list": [
-                {
-                    "ok": False,
-                    "msg": "Your response is too short. Please try again.",
-                    "grade_decimal": 0,
-                }
-            ]
-        }
-
+        return GradeResult(False, 0, gradeResult.TOO_SHORT)
 
-def videoWatchGrader(ans, grading):
 
-    # Get the student's answer.
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])
-    video_length = float(answer["video_length"])
-    watch_times = answer["watch_times"]
-    start_time = float(answer["start_time"])
-
-    durations = []
-    total_watch_time = 0
-    end_time = 0
-    grade = 0
-
-    # Remove duplicates and sort the list
-    watch_times = [float(i) for i in watch_times]
-    watch_times = list(set(watch_times))
-    watch_times.sort()
-
-    # Count up the times
-    for j in watch_times:
-
-        ind = watch_times.index(j)
-        this_time = j
-
-        next_time = watch_times[ind + 1]
-
-        # If the next one is the last item, mark it as an end and we're done.
-        if ind == len(watch_times) - 2:
-            end_time = next_time
-            durations.append(end_time - start_time)
-            break
-
-        # If the next time is too far ahead, call this an end and push duration
-        elif next_time - this_time > 3:
-            end_time = this_time
-            durations.append(end_time - start_time)
-            start_time = next_time
-
-        # If this is the first time, make sure we're using that as our start time.
-        elif ind == 0:
-            start_time = this_time
-
-        # Otherwise, just keep counting up.
-        else:
-            pass
-
-    # Add up all the durations to get the total
-    total_watch_time = sum(durations)
-
-    grade = total_watch_time / video_length
-
-    if grading == "strict":
-        grade = grade * grade
-    elif grading == "generous":
-        grade = math.sqrt(grade)
-
-    # Round up to the nearest tenth.
-    grade = math.ceil(grade * 10.0) / 10.0
-    grade = min(grade, 1.0)
+@call_counter
+def videoWatchGrader(ans, grading, gap_threshold=3, score_brackets=None):
+
+    from . import watchIntervals
+
+    # Get the student's answer. The state can have raw heartbeats
+    # ("watch_times"), compact intervals ("watched_intervals"), or both.
+    video_length, watch_times, watched_intervals = stateDecoder.decodeFields(
+        ans,
+        ("video_length", stateDecoder.NUMBER),
+        ("watch_times", list, []),
+        ("watched_intervals", list, []),
+        grader="videoWatchGrader",
+    )
+    video_length = float(video_length)
 
-    msg = "You watched about " + str(int(grade * 100)) + " percent of the video."
+    # Join heartbeats that are close together into watched intervals,
+    # then add up how long each of those intervals is.
+    intervals = watchIntervals.foldWatchTimes(
+        watched_intervals, watch_times, gap_threshold
+    )
+    total_watch_time = watchIntervals.totalWatchTime(intervals)
 
-    if grade > 0.95:
-        isOK = True
-    elif grade > 0.20:
-        isOK = "Partial"
-    else:
-        isOK = False
+    isOK, grade, percent = watchIntervals.watchGrade(
+        total_watch_time, video_length, grading, score_brackets
+    )
 
-    return {"input_list": [{"ok": isOK, "msg": msg, "grade_decimal": grade}]}
+    return GradeResult(isOK, grade, gradeResult.VIDEO_WATCHED, (percent,))
 
 
+@call_counter
 def matchingWithParticipation(
     ans, right_answer, partial_credit, feedback, participation_credit
 ):
-    base_return = matchingAGrader(ans, right_answer, partial_credit, feedback)
-
-    return {
-        "input_list": [
-            {
-                "ok": base_return["input_list"][0]["ok"],
-                "msg": base_return["input_list"][0]["msg"],
-                "grade_decimal": min(
-                    1,
-                    participation_credit
-                    + base_return["input_list"][0]["grade_decimal"],
-                ),
-            }
-        ]
-    }
+    # The unwrapped grader, so a rejected payload gets no participation
+    # credit and the call isn't counted as a second grade.
+    base = matchingAGrader.__wrapped__(ans, right_answer, partial_credit, feedback)
+
+    return GradeResult(
+        base.ok,
+        min(1, participation_credit + base.grade),
+        base.template,
+        base.args,
+    )
 
 
-def matchingAGrader(ans, right_answer, partial_credit, feedback):
+@call_counter
+def matchingAGrader(ans, right_answer, partial_credit, feedback, score_brackets=None):
 
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])
-    answer = answer["pairings"]
+    from . import matchingIndex
 
-    if partial_credit:
+    (answer,) = stateDecoder.decodeFields(
+        ans, ("pairings", list), grader="matchingAGrader"
+    )
 
-        currentpoints = []
-        wrong_answers = []
-        maxpoints = []
-        scores = []
-        answer_index = 0
-
-        for right_answer_n in right_answer:
-
-            maxpoints.append(len(right_answer_n))
-            currentpoints.append(0)
-            wrong_answers.append(0)
-
-            for item in answer:
-                does_match = False
-                for target in right_answer_n:
-                    if item == target:
-                        does_match = True
-                        break
-                if does_match:
-                    currentpoints[answer_index] += 1
-                else:
-                    wrong_answers[answer_index] += 1
-
-            scores.append(
-                (float(currentpoints[answer_index] - wrong_answers[answer_index]))
-                / float(maxpoints[answer_index])
-            )
-            answer_index += 1
+    spec = matchingIndex.compileMatching(right_answer)
+
+    if partial_credit:
 
-        final_grade = max(scores)
-        final_index = scores.index(final_grade)
+        currentpoints, maxpoints, wrong_answers, final_grade = spec.bestPartial(answer)
         final_grade = round(final_grade, 2)
         final_grade = max(final_grade, 0)
-        message = str(currentpoints[final_index])
-        message += " correct out of "
-        message += str(maxpoints[final_index])
-        message += ", "
-        message += str(wrong_answers[final_index])
-        message += " wrong."
 
-        is_right = False
-        if 0.1 < final_grade < 0.9:
-            is_right = "Partial"
-        elif final_grade >= 0.9:
-            is_right = True
-
-        if not feedback:
-            message = ""
+        brackets = gradeBrackets.compileBrackets(score_brackets, gradeBrackets.MATCHING)
+        is_right, final_grade = brackets.score(final_grade)
 
-        return {
-            "input_list": [
-                {"ok": is_right, "msg": message, "grade_decimal": final_grade}
-            ]
-        }
+        if feedback:
+            return GradeResult(
+                is_right,
+                final_grade,
+                gradeResult.MATCHING_FEEDBACK,
+                (currentpoints, maxpoints, wrong_answers),
+            )
+        return GradeResult(is_right, final_grade)
 
     else:
-        answer_sort = sorted(answer)
+        is_right = spec.isExactMatch(answer)
 
-        is_right = False
-
-        for right_answer_n in right_answer:
-            right_answer_sort = sorted(right_answer_n)
-
-            if answer_sort == right_answer_sort:
-                is_right = True
-                break
-            else:
-                is_right = False
-
-        return {
-            "input_list": [
-                {"ok": is_right, "msg": "", "grade_decimal": 1 if is_right else 0}
-            ]
-        }
+        return GradeResult(is_right, 1 if is_right else 0)
 
 
 #######################################################################
 # The following block provides a grader for ordinal data.
 # Scores are calculated using Levenshtein distances.
-# Several helper functions are below (before the grader code),
-# taken from https://www.python-course.eu/levenshtein_distance.php
+# The distance itself lives in stringDistance.py, which computes it
+# iteratively and keeps only a bounded cache of recent results.
 #######################################################################
 
 
-def call_counter(func):
-    def helper(*args, **kwargs):
-        helper.calls += 1
-        return func(*args, **kwargs)
-
-    helper.calls = 0
-    helper.__name__ = func.__name__
-    return helper
-
-
-def memoize(func):
-    mem = {}
-
-    def memoizer(*args, **kwargs):
-        key = str(args) + str(kwargs)
-        if key not in mem:
-            mem[key] = func(*args, **kwargs)
-        return mem[key]
+@call_counter
+def levenshtein(s, t, max_distance=None):
+    from . import stringDistance
 
-    return memoizer
+    return stringDistance.levenshtein(s, t, max_distance)
 
 
 @call_counter
-@memoize
-def levenshtein(s, t):
-    if s == "":
-        return len(t)
-    if t == "":
-        return len(s)
-    if s[-1] == t[-1]:
-        cost = 0
-    else:
-        cost = 1
-
-    res = min(
-        [
-            levenshtein(s[:-1], t) + 1,
-            levenshtein(s, t[:-1]) + 1,
-            levenshtein(s[:-1], t[:-1]) + cost,
-        ]
-    )
-    return res
-
-
 def orderGrader(
     ans,
     right_answer,
     new_options={"partial_credit": True, "feedback": True, "all_correct": False},
 ):
 
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])
-    answer = answer["pairings"]
+    from . import orderScoring
 
-    options = {"partial_credit": True, "feedback": True, "all_correct": False}
-    options.update(new_options)
+    specs = graderSpecs or _graderSpecs()
 
-    if options["all_correct"]:
-        return {
-            "input_list": [
-                {"ok": True, "msg": "Thank you for your response.", "grade_decimal": 1}
-            ]
-        }
+    (answer,) = stateDecoder.decodeFields(ans, ("pairings", list), grader="orderGrader")
 
-    # We only care about the letters and their order in this problem type.
-    # Make sure pairings are in order by number.
-    answer_sort = sorted(answer, key=lambda x: x[1])
-    # Make it one word for easy comparison.
-    answer_word = "".join([x[0] for x in answer_sort])
+    # Options are checked and normalized once per problem.
+    # Pass in a graderSpecs.OrderSpec as right_answer to skip even that.
+    spec = specs.compileOrder(right_answer, new_options)
 
-    currentpoints = []
-    maxpoints = []
-    scores = []
+    if spec.all_correct:
+        return GradeResult(True, 1, gradeResult.THANKS)
 
-    for right_answer_n in right_answer:
-
-        # Lose a point for every change that needs to happen
-        # to make your sequence into the right one.
-        lev_dist = levenshtein(answer_word.lower(), right_answer_n.lower())
-        points = len(right_answer_n) - lev_dist
+    # We only care about the items and their order in this problem type.
+    # Make sure pairings are in order by number.
+    answer_sort = sorted(answer, key=lambda x: x[1])
 
-        currentpoints.append(points)
-        maxpoints.append(len(right_answer_n))
-        scores.append(float(currentpoints[-1]) / float(maxpoints[-1]))
+    if spec.legacy:
+        # Make it one word for easy comparison.
+        answer_word = "".join([x[0] for x in answer_sort]).lower()
+        answer_tokens = None
+        placed = len(answer_word)
+    else:
+        answer_tokens = tuple(str(x[0]).lower() for x in answer_sort)
+        placed = len(answer_tokens)
+        # String right answers mixed in with lists are compared with
+        # the items joined into one word, as usual.
+        answer_word = "".join(answer_tokens) if spec.has_words else None
+
+    # Lose a point for every change that needs to happen
+    # to make your sequence into the right one.
+    # Later right answers stop early once they can't beat the best so far.
+    # This goes straight to stringDistance rather than through the
+    # levenshtein grader above, so it isn't counted as a separate call.
+    current_points, max_points, final_grade = orderScoring.bestOrder(
+        answer_word, answer_tokens, spec.variants, spec.metric
+    )
 
-    final_grade = max(scores)
-    final_index = scores.index(final_grade)
     final_grade = round(final_grade, 2)
     final_grade = max(final_grade, 0)
-    delta = maxpoints[final_index] - currentpoints[final_index]
-    message = "You are " + str(delta)
-    message += " changes " if delta > 1 else " change "
-    message += " away from the ideal sequence."
+    delta = max_points - current_points
+    message = gradeResult.ORDER_CHANGES if delta > 1 else gradeResult.ORDER_CHANGE
+    message_args = (delta,)
 
-    is_right = False
-    if 0.1 < final_grade < 0.9 and options["partial_credit"]:
-        is_right = "Partial"
-    elif final_grade >= 0.9:
-        is_right = True
+    is_right, final_grade = spec.brackets.score(final_grade)
 
     # No points for placing just one item.
-    if len(answer_word) == 1:
-        message = "Only one item placed."
+    if placed == 1:
+        message = gradeResult.ORDER_ONE_ITEM
+        message_args = ()
         final_grade = 0
         is_right = False
 
     if final_grade == 1:
-        message = "This sequence is correct."
+        message = gradeResult.ORDER_CORRECT
+        message_args = ()
 
-    if not options["feedback"]:
-        message = ""
+    if not spec.feedback:
+        return GradeResult(is_right, final_grade)
 
-    return {
-        "input_list": [{"ok": is_right, "msg": message, "grade_decimal": final_grade}]
-    }
+    return GradeResult(is_right, final_grade, message, message_args)
 
 
+@call_counter
 def rangeGuessGrader(ans, options):
 
+    # Options are checked and normalized once per problem.
+    # Pass in a graderSpecs.RangeGuessSpec as options to skip even that.
+    spec = (graderSpecs or _graderSpecs()).compileRangeGuess(options)
+
     # Get the student's answer.
-    parsed = json.loads(ans)
-    answer = json.loads(parsed["answer"])
-    guess_upper = answer["upperguess"]
-    guess_lower = answer["lowerguess"]
-    guess_upper_closed = answer["upperclosed"]
-    guess_lower_closed = answer["lowerclosed"]
+    (
+        guess_upper,
+        guess_lower,
+        guess_upper_closed,
+        guess_lower_closed,
+    ) = stateDecoder.decodeFields(
+        ans,
+        ("upperguess", (int, float)),
+        ("lowerguess", (int, float)),
+        ("upperclosed", None),
+        ("lowerclosed", None),
+        grader="rangeGuessGrader",
+    )
 
     # Now begins the grading.
-    message = ""
+    # The message is kept as a gradeResult template and its arguments.
+    message = gradeResult.NO_MESSAGE
+    message_args = ()
     final_grade = 0
 
-    if options["problem_type"] == "interval":
-        if guess_upper < options["correct_interval"][0]:
+    if spec.is_interval:
+        if guess_upper < spec.correct_low:
             # No points if there's no overlap.
-            message = "Answer not in selected range."
-        elif guess_lower > options["correct_interval"][1]:
+            message = gradeResult.RANGE_MISSED
+        elif guess_lower > spec.correct_high:
             # Same here.
-            message = "Answer not in selected range."
+            message = gradeResult.RANGE_MISSED
         else:
             # Points based on percentage overlap.
             endpoints = []
-            endpoints.append(options["correct_interval"][0])
-            endpoints.append(options["correct_interval"][1])
+            endpoints.append(spec.correct_low)
+            endpoints.append(spec.correct_high)
             endpoints.append(guess_upper)
             endpoints.append(guess_lower)
             endpoints.sort()
 
             overlap = endpoints[2] - endpoints[1]
             bigrange = max(
-                options["correct_interval"][1] - options["correct_interval"][0],
+                spec.correct_high - spec.correct_low,
                 guess_upper - guess_lower,
             )
             final_grade = float(overlap) / float(bigrange)
 
-            message = (
-                str(int(round(final_grade, 2) * 100)) + "% overlap with correct answer."
-            )
+            percent = int(round(final_grade, 2) * 100)
+            lower_wrong = ""
+            upper_wrong = ""
 
-            if options["interval_tolerance"] == "strict":
+            if spec.interval_tolerance == "strict":
                 final_grade = final_grade * final_grade
-            elif options["interval_tolerance"] == "generous":
+            elif spec.interval_tolerance == "generous":
                 final_grade = math.sqrt(final_grade)
 
             # Round up to the nearest tenth.
             final_grade = math.ceil(final_grade * 10.0) / 10.0
 
-            if options["show_open_close"]:
-                if (
-                    guess_lower_closed != True
-                    and options["interval_type"][0] == "closed"
-                ):
-                    final_grade = final_grade - options["type_penalty"]
-                    message += " Lower endpoint is wrong."
-                if (
-                    guess_lower_closed == True
-                    and options["interval_type"][0] != "closed"
-                ):
-                    final_grade = final_grade - options["type_penalty"]
-                    message += " Lower endpoint is wrong."
-                if (
-                    guess_upper_closed != True
-                    and options["interval_type"][1] == "closed"
-                ):
-                    final_grade = final_grade - options["type_penalty"]
-                    message += " Upper endpoint is wrong."
-                if (
-                    guess_upper_closed == True
-                    and options["interval_type"][1] != "closed"
-                ):
-                    final_grade = final_grade - options["type_penalty"]
-                    message += " Upper endpoint is wrong."
+            if spec.show_open_close:
+                if (guess_lower_closed == True) != spec.lower_closed:
+                    final_grade = final_grade - spec.type_penalty
+                    lower_wrong = gradeResult.LOWER_WRONG
+                if (guess_upper_closed == True) != spec.upper_closed:
+                    final_grade = final_grade - spec.type_penalty
+                    upper_wrong = gradeResult.UPPER_WRONG
+
+            message = gradeResult.RANGE_OVERLAP
+            message_args = (percent, lower_wrong, upper_wrong)
 
     else:
 
         farthest = max(
-            abs(options["correct_number"] - guess_upper),
-            abs(options["correct_number"] - guess_lower),
+            abs(spec.correct_number - guess_upper),
+            abs(spec.correct_number - guess_lower),
         )
 
-        if farthest < options["tolerance"][0]:
-            final_grade = options["brackets"][0]
-            message = "Close enough! Actual answer: " + str(options["correct_number"])
-        elif farthest < options["tolerance"][1]:
-            final_grade = options["brackets"][1]
-            message = "Close. You are off by " + str(farthest)
-        elif farthest < options["tolerance"][2]:
-            final_grade = options["brackets"][2]
-            message = "Not very close. You are off by " + str(farthest)
+        # Which tolerance bracket are we in? 0 is the closest, 3 is none.
+        bracket = 3 - spec.distance_brackets.index(-farthest)
+        final_grade = spec.brackets[bracket]
+
+        if guess_upper > spec.correct_number and guess_lower < spec.correct_number:
+            where = gradeResult.INSIDE_RANGE
         else:
-            final_grade = options["brackets"][3]
-            message = "Your range is too large to get points."
-
-        if (
-            guess_upper > options["correct_number"]
-            and guess_lower < options["correct_number"]
-        ):
-            message += " The answer is within your range."
+            where = gradeResult.OUTSIDE_RANGE
+
+        if bracket == 0:
+            message = gradeResult.RANGE_CLOSE_ENOUGH
+            message_args = (spec.correct_number, where)
+        elif bracket == 1:
+            message = gradeResult.RANGE_CLOSE
+            message_args = (farthest, where)
+        elif bracket == 2:
+            message = gradeResult.RANGE_NOT_CLOSE
+            message_args = (farthest, where)
         else:
-            message += " The answer is outside your range."
+            message = gradeResult.RANGE_TOO_LARGE
+            message_args = (where,)
 
-    if not options["feedback"]:
-        message = ""
+    isOK, final_grade = spec.score_brackets.score(final_grade)
 
-    if final_grade > 0.95:
-        isOK = True
-    elif final_grade > 0.05:
-        isOK = "Partial"
-    else:
-        isOK = False
+    if not spec.feedback:
+        return GradeResult(isOK, final_grade)
 
-    return {"input_list": [{"ok": isOK, "msg": message, "grade_decimal": final_grade}]}
+    return GradeResult(isOK, final_grade, message, message_args)
 
 
-def getRangeGuesserParams(options):
+@call_counter
+def getRangeGuesserParams(options, learner_id=None, problem_id=None, salt=""):
 
-    # Set the outer bounds for the slider
-    if options["problem_type"] == "interval":
-        range = options["correct_interval"][1] - options["correct_interval"][0]
-        lowerlimit = options["correct_interval"][0] - 2 * range * (random.random() + 1)
-        upperlimit = options["correct_interval"][1] + 2 * range * (random.random() + 1)
-    else:
-        range = options["tolerance"][2]
-        lowerlimit = options["correct_number"] - 2 * range * (random.random() + 1)
-        upperlimit = options["correct_number"] + 2 * range * (random.random() + 1)
+    # With a learner and problem id the bounds come from a hash of the
+    # two, so they're the same on every page load and can be cached or
+    # read from a precomputed table. See rangeGuessBounds.py.
+    if learner_id is not None and problem_id is not None:
+        from . import rangeGuessBounds
+
+        return rangeGuessBounds.seededBounds(options, learner_id, problem_id, salt)
+
+    import random
+
+    from . import rangeGuessSlider
 
-    return {"upper": upperlimit, "lower": lowerlimit}
+    # Set the outer bounds for the slider.
+    return rangeGuessSlider.sliderBounds(options, random.random(), random.random())
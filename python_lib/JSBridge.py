@@ -1,11 +1,136 @@
+import json
+import re
+import zlib
+
+#######################################################################
+# Script output for problem pages.
+# Every problem that uses the bridge used to print its own copy of the
+# same JavaScript. Now the shared code lives in a few script bodies,
+# minified once when this module loads, and each call adds a short
+# snippet that calls into them:
+#
+#   JSBridge.JSAlert(5)
+#   -> <script src='/static/hxjs-core-1a2b3c4d.js'></script>
+#      <script>HXJS.alert(5);</script>
+#
+# By default a call only refers to the shared body by file name, so the
+# browser loads it once and caches it for every page. Write the files
+# out with writeBundle() and upload them to Files & Uploads; edX serves
+# them under /static/. Each name includes a hash of the body, so a
+# changed script gets a new name. Each body also checks a flag in the
+# browser, so a page that refers to it several times runs it only once.
+#
+# When you build a whole page in one place, a PageBundle puts each body
+# inline, once, for pages that can't use uploaded files:
+#
+#   bundle = JSBridge.PageBundle()
+#   bundle.call("alert", 5) + bundle.call("log", "again")
+#
+# Set static_url to None to put the body inline with every call instead.
+#######################################################################
+
+# Shared script bodies. Minifying joins the trimmed lines and drops the
+# spaces around punctuation outside of quoted strings, so end every
+# statement with a semicolon, don't use // comments or regex literals,
+# and don't write two + or - signs in a row.
+SOURCES = {
+    "core": """
+        window.HXJS = window.HXJS || {};
+        HXJS.log = function (message) {
+            console.log(message);
+        };
+        HXJS.alert = function (value) {
+            console.log('Alert! ' + value);
+        };
+    """,
+}
+
+# Where uploaded bundle files are served from. None puts them inline.
+static_url = "/static/"
+
+
+_QUOTED = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")""")
+_PUNCTUATION = re.compile(r"\s*([=(){}\[\],;:+\-*/<>!&|?])\s*")
+
+
+def minify(source):
+    code = "".join(line.strip() for line in source.splitlines())
+    parts = _QUOTED.split(code)
+    # Odd parts are the quoted strings, which are kept as they are.
+    for i in range(0, len(parts), 2):
+        parts[i] = _PUNCTUATION.sub(r"\1", parts[i])
+    return "".join(parts)
+
+
+class SharedScript(object):
+    __slots__ = ("name", "hash", "filename", "body", "inline_tag")
+
+    def __init__(self, name, source):
+        code = minify(source)
+        # crc32 is plenty to tell versions apart, and zlib is already
+        # loaded when we're imported from python_lib.zip.
+        self.name = name
+        self.hash = "%08x" % zlib.crc32(code.encode("utf-8"))
+        self.filename = "hxjs-%s-%s.js" % (name, self.hash)
+        key = name + "-" + self.hash
+        self.body = (
+            "window.HXJS_LOADED=window.HXJS_LOADED||{};"
+            "if(!HXJS_LOADED['%s']){HXJS_LOADED['%s']=1;%s}" % (key, key, code)
+        )
+        self.inline_tag = "<script data-hxjs='%s'>%s</script>"
+        self.inline_tag %= (key, self.body)
+
+    def tag(self):
+        if static_url is None:
+            return self.inline_tag
+        return "<script src='%s%s'></script>" % (static_url, self.filename)
+
+
+SCRIPTS = {name: SharedScript(name, source) for name, source in SOURCES.items()}
+
+
+# One call into the shared code. Arguments go through JSON, with "</"
+# escaped so a value can't close the script tag.
+def callSnippet(function, *args):
+    encoded = ",".join(json.dumps(a).replace("</", "<\\/") for a in args)
+    return "<script>HXJS.%s(%s);</script>" % (function, encoded)
+
+
+# For one page only; start a new one for each page you build.
+class PageBundle(object):
+    def __init__(self):
+        self.emitted = set()
+
+    # The shared body, inline, the first time, and "" after that.
+    def shared(self, name):
+        if name in self.emitted:
+            return ""
+        self.emitted.add(name)
+        return SCRIPTS[name].inline_tag
+
+    def call(self, function, *args):
+        return self.shared("core") + callSnippet(function, *args)
+
+
+# Writes each shared body to its own file, for uploading.
+def writeBundle(directory):
+    import os
+
+    os.makedirs(directory, exist_ok=True)
+    filenames = []
+    for script in SCRIPTS.values():
+        with open(os.path.join(directory, script.filename), "w") as f:
+            f.write(script.body)
+        filenames.append(script.filename)
+    return filenames
+
+
+_WORKING = callSnippet("log", "JSBridge Working")
+
+
 def insertJavascript():
-    script = """<script type='text/javascript'>
-        console.log('JSBridge Working');
-        </script>"""
-    return script
+    return SCRIPTS["core"].tag() + _WORKING
+
 
 def JSAlert(myNumber):
-    script = """<script type='text/javascript'>
-        console.log('Alert! ' + """ + str(myNumber) + """);
-        </script>"""
-    return script
\ No newline at end of file
+    return SCRIPTS["core"].tag() + callSnippet("alert", myNumber)
@@ -0,0 +1,251 @@
+import argparse
+import collections
+import concurrent.futures
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+
+from . import gradeResult
+from . import graderSpecs
+from . import stateDecoder
+
+#######################################################################
+# Batch regrading for stored submissions.
+# Reads a JSONL export (optionally gzipped) one line at a time, sends
+# chunks of submissions to a process pool, and writes results back out
+# in input order as soon as each chunk is done. Only a fixed number of
+# chunks is ever in flight, so memory stays flat however big the file.
+#
+# Each input line is a JSON object. The submission state is taken from
+# ans_field (default "ans"); if that key is missing, the whole line is
+# used as the state. Use it like this:
+#
+#   python -m python_lib.batchGrade orderGrader in.jsonl.gz out.jsonl \
+#       --args '[["abcd"], {"feedback": false}]'
+#######################################################################
+
+
+def openText(path, mode="r"):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, mode + "b"), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+# Stands in for an input line that isn't a JSON object, so the rest of
+# the file is still graded and the output says which line was skipped.
+class UnreadableLine(object):
+    __slots__ = ("line", "error")
+
+    def __init__(self, line, error):
+        self.line = line
+        self.error = error
+
+
+def readSubmissions(path):
+    f = openText(path, "r")
+    try:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = stateDecoder.loads(line)
+            except ValueError as e:
+                yield UnreadableLine(number, type(e).__name__ + ": " + str(e))
+                continue
+            if isinstance(record, dict):
+                yield record
+            else:
+                yield UnreadableLine(number, "Line is not a JSON object.")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+# spec is anything with a grade(ans) method, usually from
+# graderSpecs.compileGrader. With compact=True the result is left as a
+# gradeResult.GradeResult, which is much smaller to keep and to send
+# back from a worker process.
+def gradeRecord(spec, record, ans_field="ans", id_field="id", compact=False):
+    if isinstance(record, UnreadableLine):
+        return {"line": record.line, "error": record.error}
+    if ans_field in record:
+        ans = record[ans_field]
+    else:
+        ans = record
+    if not isinstance(ans, str):
+        ans = json.dumps(ans)
+
+    output = {}
+    if id_field in record:
+        output[id_field] = record[id_field]
+    try:
+        if compact:
+            output["result"] = spec.grade(ans, compact=True)
+        else:
+            output["result"] = spec.grade(ans)
+    except Exception as e:
+        output["error"] = type(e).__name__ + ": " + str(e)
+    return output
+
+
+# One result cache per worker process, reused across chunks.
+_result_caches = {}
+
+
+def gradeChunk(grader_name, grader_args, ans_field, id_field, records, cache_path=None):
+    stateDecoder.useFastBackend()
+    if cache_path is None:
+        spec = graderSpecs.compileGrader(grader_name, *grader_args)
+        return [gradeRecord(spec, r, ans_field, id_field, True) for r in records]
+
+    from . import resultCache
+
+    cache = _result_caches.get(cache_path)
+    if cache is None:
+        cache = _result_caches[cache_path] = resultCache.ResultCache(path=cache_path)
+    spec = cache.bind(grader_name, *grader_args)
+    results = [gradeRecord(spec, r, ans_field, id_field) for r in records]
+    cache.flush()
+    return results
+
+
+# Workers send back compact results; they become edX dicts one at a
+# time on the way out, unless the caller wants them compact.
+def finishResults(outputs, compact=False):
+    for output in outputs:
+        result = output.get("result")
+        if not compact and isinstance(result, gradeResult.GradeResult):
+            output["result"] = result.toEdX()
+        yield output
+
+
+def chunked(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def regradeStream(
+    records,
+    grader_name,
+    grader_args=(),
+    processes=None,
+    chunk_size=500,
+    ans_field="ans",
+    id_field="id",
+    cache_path=None,
+    compact=False,
+):
+    # Fail early on a bad grader name or options, before any workers start.
+    grader_args = tuple(grader_args)
+    graderSpecs.compileGrader(grader_name, *grader_args)
+    chunks = chunked(records, chunk_size)
+
+    if processes == 1:
+        for chunk in chunks:
+            outputs = gradeChunk(
+                grader_name, grader_args, ans_field, id_field, chunk, cache_path
+            )
+            for result in finishResults(outputs, compact):
+                yield result
+        return
+
+    processes = processes or os.cpu_count() or 1
+    max_pending = processes * 2
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(
+                pool.submit(
+                    gradeChunk,
+                    grader_name,
+                    grader_args,
+                    ans_field,
+                    id_field,
+                    chunk,
+                    cache_path,
+                )
+            )
+            # Backpressure: wait on the oldest chunk before reading more.
+            if len(pending) >= max_pending:
+                for result in finishResults(pending.popleft().result(), compact):
+                    yield result
+        while pending:
+            for result in finishResults(pending.popleft().result(), compact):
+                yield result
+
+
+def regradeFile(in_path, out_path, grader_name, grader_args=(), **kwargs):
+    count = 0
+    errors = 0
+    out = openText(out_path, "w")
+    try:
+        for result in regradeStream(
+            readSubmissions(in_path), grader_name, grader_args, **kwargs
+        ):
+            out.write(json.dumps(result) + "\n")
+            count += 1
+            if "error" in result:
+                errors += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    return {"graded": count, "errors": errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Regrade a JSONL export of submission states."
+    )
+    parser.add_argument("grader", help="Name of a grader in HXGraders")
+    parser.add_argument("input", help="Input .jsonl or .jsonl.gz file, or -")
+    parser.add_argument("output", help="Output .jsonl or .jsonl.gz file, or -")
+    parser.add_argument(
+        "--args",
+        default="[]",
+        help="JSON list of extra arguments passed to the grader after ans",
+    )
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--ans-field", default="ans")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help="SQLite file of earlier results to reuse between runs",
+    )
+    args = parser.parse_args(argv)
+
+    grader_args = json.loads(args.args)
+    if not isinstance(grader_args, list):
+        parser.error("--args must be a JSON list")
+
+    summary = regradeFile(
+        args.input,
+        args.output,
+        args.grader,
+        grader_args,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        ans_field=args.ans_field,
+        id_field=args.id_field,
+        cache_path=args.cache,
+    )
+    sys.stderr.write(json.dumps(summary) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
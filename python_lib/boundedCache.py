@@ -0,0 +1,87 @@
+import marshal
+from collections import OrderedDict
+
+#######################################################################
+# A small least-recently-used cache with a fixed size.
+# Grader workers can run for days, so anything we remember between
+# submissions has to stay bounded. Entries past max_size are evicted
+# oldest-first, and hit/miss/eviction counts are kept for monitoring.
+#######################################################################
+
+# Misses are common in some caches, and raising KeyError for each one
+# costs more than the lookup.
+_MISSING = object()
+
+
+class BoundedCache(object):
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": float(self.hits) / lookups if lookups else 0.0,
+        }
+
+
+# Compiled problem data, found either by an explicit problem key or by
+# the content of the objects it was built from. The content key is the
+# objects written out with marshal, which keeps 1, 1.0 and True apart
+# and lists apart from tuples, and costs much less than repr() for the
+# JSON-style options graders get. Anything marshal can't write falls
+# back to repr(). Options changed in place get a new key, so they are
+# compiled again. A caller that passes problem_key promises that the
+# key changes whenever the problem does.
+class ContentCache(BoundedCache):
+    def compiled(self, build, objects, problem_key=None):
+        if problem_key is not None:
+            key = ("problem_key", problem_key)
+        else:
+            try:
+                key = marshal.dumps(objects, 2)
+            except ValueError:
+                key = repr(objects)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build(*objects)
+            self.set(key, value)
+        return value
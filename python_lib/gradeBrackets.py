@@ -0,0 +1,127 @@
+import bisect
+import math
+
+#######################################################################
+# Shared score-to-grade tables.
+# Each grader turns a raw score into an edX status (True, "Partial" or
+# False) and sometimes a fixed grade, using its own thresholds. A
+# Brackets table holds those thresholds sorted once, so a lookup is a
+# single bisect, and the same table can score a whole NumPy array.
+#
+# Entries are (threshold, status) or (threshold, status, grade), meaning
+# "a score above threshold gets this status and grade". A grade of None
+# keeps the score as the grade. Add a fourth item, True, to make the
+# threshold inclusive (score >= threshold). Scores that clear no
+# threshold get below_status and below_grade. If two entries share a
+# threshold, the one listed first wins.
+#
+# Course teams can pass their own entries as the "score_brackets"
+# option to any grader that uses these tables.
+#######################################################################
+
+
+# edX only understands these. Checked with "is" so that 1 and 0 from a
+# JSON options file aren't taken for True and False.
+def checkStatus(status):
+    if status is True or status is False or status == "Partial":
+        return status
+    raise ValueError(
+        'Bracket status must be True, False or "Partial", not ' + repr(status)
+    )
+
+
+class Brackets(object):
+    __slots__ = ("thresholds", "statuses", "grades", "below_status", "below_grade")
+
+    def __init__(self, entries, below_status=False, below_grade=None):
+        parsed = []
+        for entry in reversed(list(entries)):
+            threshold = float(entry[0])
+            if len(entry) > 3 and entry[3]:
+                threshold = math.nextafter(threshold, -math.inf)
+            grade = entry[2] if len(entry) > 2 else None
+            parsed.append((threshold, checkStatus(entry[1]), grade))
+        parsed.sort(key=lambda e: e[0])
+
+        self.thresholds = [e[0] for e in parsed]
+        self.statuses = [e[1] for e in parsed]
+        self.grades = [e[2] for e in parsed]
+        self.below_status = checkStatus(below_status)
+        self.below_grade = below_grade
+
+    # 0 if the score clears no threshold, otherwise 1 + the position of
+    # the highest threshold it clears.
+    def index(self, score):
+        return bisect.bisect_left(self.thresholds, score)
+
+    def status(self, score):
+        i = bisect.bisect_left(self.thresholds, score)
+        return self.statuses[i - 1] if i else self.below_status
+
+    # Returns (status, grade).
+    def score(self, score):
+        i = bisect.bisect_left(self.thresholds, score)
+        if i:
+            status, grade = self.statuses[i - 1], self.grades[i - 1]
+        else:
+            status, grade = self.below_status, self.below_grade
+        return status, score if grade is None else grade
+
+    # Vectorized score(): returns (status codes, grades) as arrays, with
+    # status codes indexing STATUS_VALUES. NaN scores clear no threshold.
+    def scoreArray(self, scores):
+        import numpy as np
+
+        scores = np.asarray(scores, dtype=np.float64)
+        i = np.searchsorted(np.array(self.thresholds), scores, side="left")
+        i = np.where(np.isnan(scores), 0, i)
+
+        statuses = [self.below_status] + self.statuses
+        codes = np.array([STATUS_CODES[s] for s in statuses], dtype=np.int8)[i]
+
+        grades = [self.below_grade] + self.grades
+        fixed = np.array([np.nan if g is None else g for g in grades])[i]
+        keep = np.array([g is None for g in grades])[i]
+        return codes, np.where(keep, scores, fixed)
+
+
+STATUS_VALUES = (False, "Partial", True)
+STATUS_CODES = {False: 0, "Partial": 1, True: 2}
+
+
+def compileBrackets(entries, default):
+    if entries is None:
+        return default
+    if isinstance(entries, Brackets):
+        return entries
+    return Brackets(entries)
+
+
+# Scores below each limit get the matching grade; anything else gets
+# otherwise. Limits are checked in order, like an if/elif chain on
+# "score < limit". Use score(-value) and index(-value) with this table;
+# the statuses are all False and only the grades mean anything.
+def underLimits(limits, grades, otherwise):
+    entries = []
+    highest = None
+    for limit, grade in zip(limits, grades):
+        # A limit lower than an earlier one can never be reached first.
+        highest = limit if highest is None else max(highest, limit)
+        entries.append((-highest, False, grade))
+    return Brackets(entries, below_grade=otherwise)
+
+
+QUALTRICS = Brackets(
+    [
+        (0.76, True, 1.0),
+        (0.51, "Partial", 0.75),
+        (0.26, "Partial", 0.5),
+        (0.05, "Partial", 0.25),
+    ]
+)
+VIDEO_WATCH = Brackets([(0.95, True), (0.20, "Partial")])
+PATHWAY = Brackets([(0.7, True), (0.2, "Partial")])
+MATCHING = Brackets([(0.9, True, None, True), (0.1, "Partial")])
+ORDER = MATCHING
+ORDER_NO_PARTIAL = Brackets([(0.9, True, None, True)])
+RANGE_GUESS = Brackets([(0.95, True), (0.05, "Partial")])
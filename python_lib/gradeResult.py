@@ -0,0 +1,188 @@
+from array import array
+
+from . import gradeBrackets
+
+#######################################################################
+# Compact grading results.
+# A grader's answer comes down to a status, a grade and a message, but
+# edX wants it as {"input_list": [{"ok": ..., "msg": ..., "grade_decimal":
+# ...}]}, and most messages are a fixed sentence with a number or two
+# dropped in. A GradeResult keeps just the status, the grade, the id of
+# the message template and its arguments. The edX dict and the message
+# text are only built when something asks for them.
+#
+# The graders in HXGraders build GradeResults and hand back the edX dict
+# as always. Pass compact=True to any of them to get the GradeResult
+# instead:
+#
+#   result = HXGraders.orderGrader(ans, right_answer, compact=True)
+#   result.grade, result.ok, result.message()
+#   result.toEdX()
+#
+# A ResultBatch stores many results in flat arrays, for regrades that
+# keep millions of them around.
+#######################################################################
+
+# Message templates, filled in with "%" and the result's args.
+# Append new ones at the end: stored results refer to them by position.
+MESSAGES = (
+    "",
+    "%s",
+    "Thank you for your response.",
+    "Your response is too short. Please try again.",
+    "Your input has been accepted.",
+    "One of your responses is too short. Please try again.",
+    "One of your responses is blank. Please try again.",
+    "Saved Score: %s points out of %s",
+    "You watched about %s percent of the video.",
+    "%s correct out of %s, %s wrong.",
+    "You are %s changes  away from the ideal sequence.",
+    "You are %s change  away from the ideal sequence.",
+    "Only one item placed.",
+    "This sequence is correct.",
+    "Answer not in selected range.",
+    "%s%% overlap with correct answer.%s%s",
+    "Close enough! Actual answer: %s%s",
+    "Close. You are off by %s%s",
+    "Not very close. You are off by %s%s",
+    "Your range is too large to get points.%s",
+)
+
+(
+    NO_MESSAGE,
+    TEXT,
+    THANKS,
+    TOO_SHORT,
+    ACCEPTED,
+    ONE_TOO_SHORT,
+    ONE_BLANK,
+    PATHWAY_SCORE,
+    VIDEO_WATCHED,
+    MATCHING_FEEDBACK,
+    ORDER_CHANGES,
+    ORDER_CHANGE,
+    ORDER_ONE_ITEM,
+    ORDER_CORRECT,
+    RANGE_MISSED,
+    RANGE_OVERLAP,
+    RANGE_CLOSE_ENOUGH,
+    RANGE_CLOSE,
+    RANGE_NOT_CLOSE,
+    RANGE_TOO_LARGE,
+) = range(len(MESSAGES))
+
+# Fixed pieces the range guess templates add on the end.
+LOWER_WRONG = " Lower endpoint is wrong."
+UPPER_WRONG = " Upper endpoint is wrong."
+INSIDE_RANGE = " The answer is within your range."
+OUTSIDE_RANGE = " The answer is outside your range."
+
+STATUS_VALUES = gradeBrackets.STATUS_VALUES
+STATUS_CODES = gradeBrackets.STATUS_CODES
+
+
+class GradeResult(object):
+    # flat results (pathwayGrader's) aren't wrapped in an input_list.
+    __slots__ = ("ok", "grade", "template", "args", "flat")
+
+    def __init__(self, ok, grade, template=NO_MESSAGE, args=(), flat=False):
+        self.ok = ok
+        self.grade = grade
+        self.template = template
+        self.args = args
+        self.flat = flat
+
+    def message(self):
+        if self.args:
+            return MESSAGES[self.template] % self.args
+        return MESSAGES[self.template]
+
+    def toEdX(self):
+        message = MESSAGES[self.template]
+        if self.args:
+            message = message % self.args
+        result = {"ok": self.ok, "msg": message, "grade_decimal": self.grade}
+        if self.flat:
+            return result
+        return {"input_list": [result]}
+
+    def __eq__(self, other):
+        if not isinstance(other, GradeResult):
+            return NotImplemented
+        return (
+            self.ok == other.ok
+            and self.grade == other.grade
+            and self.message() == other.message()
+            and self.flat == other.flat
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "GradeResult(%r, %r, %r)" % (self.ok, self.grade, self.message())
+
+    def __reduce__(self):
+        return (
+            GradeResult,
+            (self.ok, self.grade, self.template, self.args, self.flat),
+        )
+
+
+class ResultBatch(object):
+    # Each result takes a double for the grade, a byte for its status
+    # and shape, and two bytes for the template id. Args are only kept
+    # for the results that have any.
+    __slots__ = ("grades", "codes", "templates", "args")
+
+    def __init__(self, results=()):
+        self.grades = array("d")
+        self.codes = array("b")
+        self.templates = array("H")
+        self.args = {}
+        self.extend(results)
+
+    def append(self, result):
+        # Bit 0: the grade was an int. Bit 1: flat result. Bits 2-3: status.
+        code = STATUS_CODES[result.ok] << 2
+        if result.flat:
+            code |= 2
+        if isinstance(result.grade, int):
+            code |= 1
+        if result.args:
+            self.args[len(self.grades)] = result.args
+        self.grades.append(result.grade)
+        self.codes.append(code)
+        self.templates.append(result.template)
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def __len__(self):
+        return len(self.grades)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.grades)
+        code = self.codes[i]
+        grade = self.grades[i]
+        if code & 1:
+            grade = int(grade)
+        return GradeResult(
+            STATUS_VALUES[code >> 2],
+            grade,
+            self.templates[i],
+            self.args.get(i, ()),
+            bool(code & 2),
+        )
+
+    def __iter__(self):
+        for i in range(len(self.grades)):
+            yield self[i]
+
+    # Counts of False / "Partial" / True results.
+    def statusCounts(self):
+        counts = [0, 0, 0]
+        for code in self.codes:
+            counts[code >> 2] += 1
+        return dict(zip(STATUS_VALUES, counts))
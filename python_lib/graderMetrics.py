@@ -0,0 +1,194 @@
+import bisect
+import time
+
+from . import gradeResult
+from . import payloadGuards
+from . import stateDecoder
+
+#######################################################################
+# Opt-in instrumentation for the graders.
+# Every grader in HXGraders is wrapped with call_counter, which always
+# keeps a plain call count. Once enable() is called it also records, per
+# grader: total and decode time, a latency histogram, payload sizes,
+# errors, and how often the result was ok / Partial / False. When turned
+# off the only cost is one flag check per call. Payload guard trips are
+# always counted (see payloadGuards.py) and are reported here too.
+#
+# Snapshots come out as a dict, as JSON, or in Prometheus text format
+# for grading workers that get scraped.
+#######################################################################
+
+enabled = False
+
+# Upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+
+OUTCOMES = {True: "ok", "Partial": "partial", False: "false"}
+
+_metrics = {}
+
+
+class GraderStats(object):
+    __slots__ = (
+        "calls",
+        "errors",
+        "seconds",
+        "decode_seconds",
+        "payload_bytes",
+        "buckets",
+        "outcomes",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.decode_seconds = 0.0
+        self.payload_bytes = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.outcomes = {"ok": 0, "partial": 0, "false": 0}
+
+    def asDict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "seconds": self.seconds,
+            "decode_seconds": self.decode_seconds,
+            "grade_seconds": self.seconds - self.decode_seconds,
+            "payload_bytes": self.payload_bytes,
+            "histogram": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets)),
+            "outcomes": dict(self.outcomes),
+        }
+
+
+def enable():
+    global enabled
+    enabled = True
+    stateDecoder.timing = True
+
+
+def disable():
+    global enabled
+    enabled = False
+    stateDecoder.timing = False
+
+
+def reset():
+    _metrics.clear()
+
+
+# Graders return a GradeResult, or either {"input_list": [{"ok": ...}]}
+# or {"ok": ...}.
+def outcomeOf(result):
+    if isinstance(result, gradeResult.GradeResult):
+        return OUTCOMES.get(result.ok)
+    if not isinstance(result, dict):
+        return None
+    if "input_list" in result:
+        try:
+            result = result["input_list"][0]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return OUTCOMES.get(result.get("ok"))
+
+
+def measure(name, func, args, kwargs):
+    stats = _metrics.get(name)
+    if stats is None:
+        stats = _metrics[name] = GraderStats()
+
+    if args and isinstance(args[0], (str, bytes)):
+        stats.payload_bytes += len(args[0])
+
+    decode_before = stateDecoder.stats["seconds"]
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except payloadGuards.PayloadRejected:
+        # Counted in payloadGuards.trips, not as an error.
+        raise
+    except Exception:
+        stats.errors += 1
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.calls += 1
+        stats.seconds += elapsed
+        stats.decode_seconds += stateDecoder.stats["seconds"] - decode_before
+        stats.buckets[bisect.bisect_left(BUCKETS, elapsed)] += 1
+
+    outcome = outcomeOf(result)
+    if outcome is not None:
+        stats.outcomes[outcome] += 1
+    return result
+
+
+def guardTrips():
+    by_grader = {}
+    for (grader, field, action), count in sorted(payloadGuards.trips.items()):
+        by_grader.setdefault(grader, {})[field + "/" + action] = count
+    return by_grader
+
+
+def snapshot():
+    result = {name: stats.asDict() for name, stats in sorted(_metrics.items())}
+    for name, grader_trips in guardTrips().items():
+        result.setdefault(name, {})["guard_trips"] = grader_trips
+    return result
+
+
+def toJSON():
+    import json
+
+    return json.dumps(snapshot(), sort_keys=True)
+
+
+def toPrometheus(prefix="hxgraders"):
+    lines = []
+
+    def header(metric, kind, help_text):
+        lines.append("# HELP " + prefix + "_" + metric + " " + help_text)
+        lines.append("# TYPE " + prefix + "_" + metric + " " + kind)
+
+    def sample(metric, labels, value):
+        label_text = ",".join(k + '="' + str(v) + '"' for k, v in labels)
+        lines.append(prefix + "_" + metric + "{" + label_text + "} " + repr(value))
+
+    items = sorted(_metrics.items())
+
+    header("calls_total", "counter", "Grader calls.")
+    for name, stats in items:
+        sample("calls_total", [("grader", name)], stats.calls)
+
+    header("errors_total", "counter", "Grader calls that raised an exception.")
+    for name, stats in items:
+        sample("errors_total", [("grader", name)], stats.errors)
+
+    header("decode_seconds_total", "counter", "Time spent decoding state.")
+    for name, stats in items:
+        sample("decode_seconds_total", [("grader", name)], stats.decode_seconds)
+
+    header("payload_bytes_total", "counter", "Size of submitted state.")
+    for name, stats in items:
+        sample("payload_bytes_total", [("grader", name)], stats.payload_bytes)
+
+    header("outcomes_total", "counter", "Grading results by outcome.")
+    for name, stats in items:
+        for outcome, count in sorted(stats.outcomes.items()):
+            sample("outcomes_total", [("grader", name), ("outcome", outcome)], count)
+
+    header("guard_trips_total", "counter", "States over a payload guard limit.")
+    for (grader, field, action), count in sorted(payloadGuards.trips.items()):
+        labels = [("grader", grader), ("field", field), ("action", action)]
+        sample("guard_trips_total", labels, count)
+
+    header("seconds", "histogram", "Time spent per grader call.")
+    for name, stats in items:
+        cumulative = 0
+        for bound, count in zip(list(BUCKETS) + ["+Inf"], stats.buckets):
+            cumulative += count
+            sample("seconds_bucket", [("grader", name), ("le", bound)], cumulative)
+        sample("seconds_sum", [("grader", name)], stats.seconds)
+        sample("seconds_count", [("grader", name)], stats.calls)
+
+    return "\n".join(lines) + "\n"
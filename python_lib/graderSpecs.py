@@ -0,0 +1,219 @@
+from . import HXGraders
+from . import gradeBrackets
+from .boundedCache import BoundedCache
+from .boundedCache import ContentCache
+
+#######################################################################
+# Compiled grader specs.
+# A problem's options never change between submissions, so we can check
+# and normalize them once, keep the result in a small __slots__ object,
+# and grade any number of submissions against it:
+#
+#   spec = graderSpecs.compileGrader("rangeGuessGrader", options)
+#   result = spec.grade(ans)
+#
+# Bad options raise ValueError when the spec is built, not in the middle
+# of grading a learner's answer. Specs are cached per problem, keyed by
+# problem_key if you give one, or by the options themselves if not.
+# As in HXGraders, a spec imports the helpers only it needs.
+#######################################################################
+
+# The graders that take a learner's answer. Nothing else in HXGraders
+# (levenshtein, call_counter, getRangeGuesserParams) can be compiled.
+GRADERS = (
+    "multiTextResponseGrader",
+    "journalingResponseGrader",
+    "pathwayGrader",
+    "qualtricsSurveyGrader",
+    "textResponseGrader",
+    "videoWatchGrader",
+    "matchingWithParticipation",
+    "matchingAGrader",
+    "orderGrader",
+    "rangeGuessGrader",
+)
+
+spec_cache = BoundedCache(max_size=512)
+
+# Specs built when a grader is called with plain options rather than
+# through compileGrader.
+options_cache = ContentCache(max_size=256)
+
+
+def _require(options, name, grader_name, length=None):
+    if name not in options:
+        raise ValueError(grader_name + " option '" + name + "' is missing.")
+    value = options[name]
+    if length is not None and (
+        not isinstance(value, (list, tuple)) or len(value) < length
+    ):
+        raise ValueError(
+            grader_name
+            + " option '"
+            + name
+            + "' needs at least "
+            + str(length)
+            + " values."
+        )
+    return value
+
+
+class RangeGuessSpec(object):
+    __slots__ = (
+        "is_interval",
+        "correct_low",
+        "correct_high",
+        "interval_tolerance",
+        "show_open_close",
+        "lower_closed",
+        "upper_closed",
+        "type_penalty",
+        "correct_number",
+        "tolerance",
+        "brackets",
+        "distance_brackets",
+        "score_brackets",
+        "feedback",
+    )
+
+    def __init__(self, options):
+        name = "rangeGuessGrader"
+        self.is_interval = _require(options, "problem_type", name) == "interval"
+        self.feedback = _require(options, "feedback", name)
+        self.score_brackets = gradeBrackets.compileBrackets(
+            options.get("score_brackets"), gradeBrackets.RANGE_GUESS
+        )
+
+        if self.is_interval:
+            correct_interval = _require(options, "correct_interval", name, 2)
+            self.correct_low = correct_interval[0]
+            self.correct_high = correct_interval[1]
+            self.interval_tolerance = _require(options, "interval_tolerance", name)
+            self.show_open_close = _require(options, "show_open_close", name)
+            if self.show_open_close:
+                interval_type = _require(options, "interval_type", name, 2)
+                self.lower_closed = interval_type[0] == "closed"
+                self.upper_closed = interval_type[1] == "closed"
+                self.type_penalty = _require(options, "type_penalty", name)
+        else:
+            self.correct_number = _require(options, "correct_number", name)
+            self.tolerance = tuple(_require(options, "tolerance", name, 3))
+            self.brackets = tuple(_require(options, "brackets", name, 4))
+            self.distance_brackets = gradeBrackets.underLimits(
+                self.tolerance[:3], self.brackets[:3], self.brackets[3]
+            )
+
+    def grade(self, ans, compact=False):
+        return HXGraders.rangeGuessGrader(ans, self, compact=compact)
+
+
+class OrderSpec(object):
+    __slots__ = (
+        "right_answer",
+        "variants",
+        "metric",
+        "legacy",
+        "has_words",
+        "partial_credit",
+        "feedback",
+        "all_correct",
+        "brackets",
+    )
+
+    def __init__(self, right_answer, new_options=None):
+        from . import orderScoring
+
+        options = {
+            "partial_credit": True,
+            "feedback": True,
+            "all_correct": False,
+            "metric": "levenshtein",
+        }
+        options.update(new_options or {})
+        self.partial_credit = options["partial_credit"]
+        self.feedback = options["feedback"]
+        self.all_correct = options["all_correct"]
+        if self.partial_credit:
+            default_brackets = gradeBrackets.ORDER
+        else:
+            default_brackets = gradeBrackets.ORDER_NO_PARTIAL
+        self.brackets = gradeBrackets.compileBrackets(
+            options.get("score_brackets"), default_brackets
+        )
+
+        self.metric = options["metric"]
+        if self.metric not in orderScoring.METRICS:
+            raise ValueError("Unknown orderGrader metric: " + str(self.metric))
+
+        # Right answers are strings of one-character items (the original
+        # format) or lists of item ids.
+        if not right_answer:
+            raise ValueError("orderGrader needs at least one right answer.")
+        for right_answer_n in right_answer:
+            if not isinstance(right_answer_n, (str, list, tuple)):
+                raise ValueError("orderGrader right answers must be strings or lists.")
+        self.variants = tuple(
+            orderScoring.OrderVariant(r, self.metric) for r in right_answer
+        )
+        self.right_answer = tuple(v.sequence for v in self.variants)
+        self.legacy = all(isinstance(r, str) for r in right_answer)
+        self.has_words = any(isinstance(r, str) for r in right_answer)
+
+    def grade(self, ans, compact=False):
+        return HXGraders.orderGrader(ans, self, compact=compact)
+
+
+# Any other grader: the extra arguments are bound once, and the lookups
+# that pathwayGrader and matchingAGrader build are compiled up front.
+class BoundGrader(object):
+    __slots__ = ("grader", "args")
+
+    def __init__(self, grader_name, args):
+        if grader_name not in GRADERS:
+            raise ValueError("Unknown grader: " + str(grader_name))
+        grader = getattr(HXGraders, grader_name)
+        args = list(args)
+        if grader_name == "pathwayGrader" and args:
+            from . import pathwayIndex
+
+            args[0] = pathwayIndex.compilePathway(args[0])
+        elif grader_name in ("matchingAGrader", "matchingWithParticipation") and args:
+            from . import matchingIndex
+
+            args[0] = matchingIndex.compileMatching(args[0])
+        self.grader = grader
+        self.args = tuple(args)
+
+    def grade(self, ans, compact=False):
+        return self.grader(ans, *self.args, compact=compact)
+
+
+def compileRangeGuess(options):
+    if isinstance(options, RangeGuessSpec):
+        return options
+    return options_cache.compiled(RangeGuessSpec, (options,))
+
+
+def compileOrder(right_answer, new_options=None):
+    if isinstance(right_answer, OrderSpec):
+        return right_answer
+    return options_cache.compiled(OrderSpec, (right_answer, new_options))
+
+
+def compileGrader(grader_name, *args, problem_key=None):
+    if problem_key is None:
+        key = (grader_name, repr(args))
+    else:
+        key = (grader_name, problem_key)
+    spec = spec_cache.get(key)
+    if spec is not None:
+        return spec
+
+    if grader_name == "rangeGuessGrader":
+        spec = RangeGuessSpec(*args)
+    elif grader_name == "orderGrader":
+        spec = OrderSpec(*args)
+    else:
+        spec = BoundGrader(grader_name, args)
+    spec_cache.set(key, spec)
+    return spec
@@ -0,0 +1,545 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import time
+import urllib.parse
+import urllib.request
+from http.client import HTTPException
+from http.cookiejar import CookieJar
+
+from . import batchGrade
+from . import graderSpecs
+from . import stateDecoder
+
+#######################################################################
+# Long-running external grading service.
+# Sandboxed grading pays for a fresh interpreter and a cold import on
+# every submission. This loads HXGraders once and keeps it warm, pulling
+# submissions from a queue and grading each one with the named grader.
+#
+# Each submission names its grader and the extra arguments that follow
+# ans, exactly like the batch regrader:
+#
+#   {"id": 7, "grader": "orderGrader", "args": [["abcd"]], "ans": "..."}
+#
+# and gets back {"id": 7, "result": {"input_list": [...]}}, or "error"
+# instead of "result" if grading raised. Problem options are compiled
+# once per problem through graderSpecs, so repeat submissions only pay
+# for the grade itself.
+#
+# Small grades run inline on the event loop. Big payloads for graders
+# whose cost grows with the answer go to a process pool instead, so one
+# long video log can't stall everyone else. At most `concurrency`
+# submissions are in flight; past that we stop pulling from the queue
+# (or reading from the socket) until a slot frees up.
+#
+# Three queues are built in: a JSONL file (for testing and replays), a
+# TCP socket speaking JSON lines, and an XQueue poller:
+#
+#   python -m python_lib.gradingService file in.jsonl out.jsonl
+#   python -m python_lib.gradingService socket --port 8765
+#   python -m python_lib.gradingService xqueue --url https://xqueue.example.org \
+#       --queue-name hx-py --user me --password secret
+#######################################################################
+
+# Graders whose run time grows with the size of the answer.
+HEAVY_GRADERS = frozenset(
+    (
+        "videoWatchGrader",
+        "pathwayGrader",
+        "matchingAGrader",
+        "matchingWithParticipation",
+        "orderGrader",
+    )
+)
+
+# Under this many bytes the pool's pickling costs more than grading.
+HEAVY_MIN_BYTES = 16384
+
+# Longest submission line the socket server reads. Room for the largest
+# payloadGuards state with every character escaped; longer lines are
+# skipped and answered with an error.
+MAX_LINE_BYTES = 8 * 1024 * 1024
+
+
+# The service runs unattended, so problems with one submission or one
+# request are written to stderr and we carry on.
+def log(message):
+    sys.stderr.write("gradingService: " + message + "\n")
+    sys.stderr.flush()
+
+
+def parseSubmission(message):
+    if isinstance(message, (str, bytes)):
+        message = stateDecoder.loads(message)
+    if not isinstance(message, dict):
+        raise ValueError("Submission must be a JSON object.")
+    grader_name = message.get("grader")
+    if not isinstance(grader_name, str):
+        raise ValueError("Submission is missing its grader name.")
+    grader_args = message.get("args", [])
+    if not isinstance(grader_args, list):
+        raise ValueError("Submission args must be a list.")
+    if "ans" not in message:
+        raise ValueError("Submission is missing ans.")
+    return grader_name, tuple(grader_args), message
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+# One line from a socket client, or b"" at the end. A line longer than
+# the reader's limit is read through to its newline and dropped, so the
+# next submission still starts on a line of its own.
+async def readLine(reader):
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b"\n")
+            break
+        except asyncio.IncompleteReadError:
+            break
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+    raise LineTooLong("Submission is longer than the line limit.")
+
+
+def _warmWorker():
+    stateDecoder.useFastBackend()
+
+
+# Runs in a pool worker; compiled specs are cached there too.
+def gradeInWorker(grader_name, grader_args, record):
+    spec = graderSpecs.compileGrader(grader_name, *grader_args)
+    return batchGrade.gradeRecord(spec, record)
+
+
+class GradingService(object):
+    def __init__(
+        self,
+        concurrency=64,
+        processes=None,
+        heavy_graders=HEAVY_GRADERS,
+        heavy_min_bytes=HEAVY_MIN_BYTES,
+        max_line_bytes=MAX_LINE_BYTES,
+    ):
+        self.concurrency = concurrency
+        self.max_line_bytes = max_line_bytes
+        self.heavy_graders = frozenset(heavy_graders)
+        self.heavy_min_bytes = heavy_min_bytes
+        self.processes = processes
+        self._slots = None
+        self._pool = None
+        self.stats = {
+            "graded": 0,
+            "errors": 0,
+            "pooled": 0,
+            "in_flight": 0,
+            "reply_errors": 0,
+        }
+        stateDecoder.useFastBackend()
+
+    def _isHeavy(self, grader_name, ans):
+        if grader_name not in self.heavy_graders or self.processes == 0:
+            return False
+        size = len(ans) if isinstance(ans, (str, bytes)) else 0
+        return size >= self.heavy_min_bytes
+
+    def _getPool(self):
+        # Spawned rather than forked, so workers don't inherit open client
+        # sockets and keep them from closing.
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.processes or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warmWorker,
+            )
+        return self._pool
+
+    async def acquire(self):
+        # Backpressure: callers wait here before taking more work.
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        await self._slots.acquire()
+        self.stats["in_flight"] += 1
+
+    def release(self):
+        self.stats["in_flight"] -= 1
+        self._slots.release()
+
+    async def grade(self, message):
+        record = None
+        try:
+            grader_name, grader_args, record = parseSubmission(message)
+            # Compiling here checks the grader name and options even when
+            # the grade itself goes to the pool.
+            spec = graderSpecs.compileGrader(grader_name, *grader_args)
+            if self._isHeavy(grader_name, record["ans"]):
+                self.stats["pooled"] += 1
+                loop = asyncio.get_running_loop()
+                output = await loop.run_in_executor(
+                    self._getPool(), gradeInWorker, grader_name, grader_args, record
+                )
+            else:
+                output = batchGrade.gradeRecord(spec, record)
+        except Exception as e:
+            output = {"error": type(e).__name__ + ": " + str(e)}
+            if record is not None and "id" in record:
+                output["id"] = record["id"]
+
+        self.stats["graded"] += 1
+        if "error" in output:
+            self.stats["errors"] += 1
+        return output
+
+    async def _gradeAndRelease(self, message, reply):
+        try:
+            await reply(await self.grade(message))
+        except Exception as e:
+            # A result we couldn't send shouldn't take the others with it.
+            self.stats["reply_errors"] += 1
+            log("couldn't send a result: " + type(e).__name__ + ": " + str(e))
+        finally:
+            self.release()
+
+    # Pulls from any queue with async get() (None when it's finished) and
+    # async put(message, result).
+    async def drain(self, queue):
+        tasks = set()
+        while True:
+            await self.acquire()
+            message = await queue.get()
+            if message is None:
+                self.release()
+                break
+
+            async def reply(result, message=message):
+                await queue.put(message, result)
+
+            task = asyncio.ensure_future(self._gradeAndRelease(message, reply))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def handleConnection(self, reader, writer):
+        tasks = set()
+        lock = asyncio.Lock()
+
+        async def reply(result):
+            async with lock:
+                writer.write(json.dumps(result).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                await self.acquire()
+                try:
+                    line = await readLine(reader)
+                except LineTooLong as e:
+                    self.release()
+                    self.stats["graded"] += 1
+                    self.stats["errors"] += 1
+                    await reply({"error": "LineTooLong: " + str(e)})
+                    continue
+                except BaseException:
+                    self.release()
+                    raise
+                if not line:
+                    self.release()
+                    break
+                if not line.strip():
+                    self.release()
+                    continue
+                task = asyncio.ensure_future(self._gradeAndRelease(line, reply))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(
+            self.handleConnection, host, port, limit=self.max_line_bytes
+        )
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+#######################################################################
+# Queues
+#######################################################################
+
+
+# Local stand-in for XQueue: reads submissions from a JSONL file and
+# writes results as they finish (so not necessarily in input order).
+class FileQueue(object):
+    def __init__(self, in_path, out_path):
+        self.reader = batchGrade.openText(in_path, "r")
+        self.writer = batchGrade.openText(out_path, "w")
+
+    async def get(self):
+        for line in self.reader:
+            if line.strip():
+                return line
+        return None
+
+    async def put(self, message, result):
+        self.writer.write(json.dumps(result) + "\n")
+
+    def close(self):
+        for f in (self.reader, self.writer):
+            if f not in (sys.stdin, sys.stdout):
+                f.close()
+        sys.stdout.flush()
+
+
+# The problem's XML sets the grader payload to a JSON object with
+# "grader" and "args"; the learner's state is the student response.
+def fromXQueue(content):
+    submission = json.loads(content)
+    body = json.loads(submission["xqueue_body"])
+    payload = json.loads(body.get("grader_payload") or "{}")
+    if not isinstance(payload, dict):
+        raise ValueError("XQueue grader payload must be a JSON object.")
+    return {
+        "id": submission["xqueue_header"],
+        "grader": payload.get("grader"),
+        "args": payload.get("args", []),
+        "ans": body.get("student_response"),
+    }
+
+
+# Just the header, so a submission we can't read still gets an answer.
+def xqueueHeader(content):
+    try:
+        return json.loads(content)["xqueue_header"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+# XQueue wants one correct/score/msg per submission. The full
+# input_list rides along for anything that can use it.
+def toXQueueBody(output):
+    if "error" in output:
+        return {"correct": False, "score": 0, "msg": "Grading error."}
+    result = output["result"]
+    if "input_list" in result:
+        inputs = result["input_list"]
+    else:
+        # pathwayGrader gives one flat result instead of an input_list.
+        inputs = [result]
+    grades = [float(i.get("grade_decimal", 0)) for i in inputs]
+    return {
+        "correct": bool(inputs) and all(i.get("ok") is True for i in inputs),
+        "score": sum(grades) / len(grades) if grades else 0,
+        "msg": " ".join(str(i.get("msg", "")) for i in inputs if i.get("msg")),
+        "input_list": inputs,
+    }
+
+
+# Failed requests (network errors, bad replies, refused logins) are
+# retried with a growing delay, up to max_backoff seconds between tries.
+# Results get put_attempts tries before they're logged and dropped.
+XQUEUE_ERRORS = (OSError, HTTPException, ValueError, RuntimeError)
+
+
+class XQueue(object):
+    def __init__(
+        self,
+        url,
+        queue_name,
+        user,
+        password,
+        poll_interval=1.0,
+        max_backoff=60.0,
+        put_attempts=3,
+    ):
+        self.url = url.rstrip("/")
+        self.queue_name = queue_name
+        self.user = user
+        self.password = password
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.put_attempts = put_attempts
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar())
+        )
+        self.logged_in = False
+
+    def _request(self, path, data=None):
+        url = self.url + path
+        if data is not None:
+            data = urllib.parse.urlencode(data).encode("utf-8")
+        with self.opener.open(url, data, timeout=30) as response:
+            reply = json.loads(response.read().decode("utf-8"))
+        return reply.get("return_code"), reply.get("content")
+
+    def _login(self):
+        code, content = self._request(
+            "/xqueue/login/", {"username": self.user, "password": self.password}
+        )
+        if code != 0:
+            raise RuntimeError("XQueue login failed: " + str(content))
+        self.logged_in = True
+
+    def _fetch(self):
+        if not self.logged_in:
+            self._login()
+        query = urllib.parse.urlencode({"queue_name": self.queue_name})
+        code, content = self._request("/xqueue/get_submission/?" + query)
+        return content if code == 0 else None
+
+    def _put(self, data):
+        if not self.logged_in:
+            self._login()
+        code, content = self._request("/xqueue/put_result/", data)
+        if code != 0:
+            raise RuntimeError("XQueue put_result failed: " + str(content))
+
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        delay = self.poll_interval
+        while True:
+            try:
+                content = await loop.run_in_executor(None, self._fetch)
+            except XQUEUE_ERRORS as e:
+                # Log in again next time, in case the session is what broke.
+                self.logged_in = False
+                log(
+                    "XQueue fetch failed, retrying in %gs: %s: %s"
+                    % (delay, type(e).__name__, e)
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            delay = self.poll_interval
+
+            if content is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                return fromXQueue(content)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                log(
+                    "skipping unreadable XQueue submission: %s: %s"
+                    % (type(e).__name__, e)
+                )
+                header = xqueueHeader(content)
+                if header is not None:
+                    await self.put({"id": header}, {"error": "Unreadable submission."})
+
+    async def put(self, message, result):
+        data = {
+            "xqueue_header": message["id"],
+            "xqueue_body": json.dumps(toXQueueBody(result)),
+        }
+        loop = asyncio.get_running_loop()
+        delay = self.poll_interval
+        for attempt in range(1, self.put_attempts + 1):
+            try:
+                await loop.run_in_executor(None, self._put, data)
+                return
+            except XQUEUE_ERRORS as e:
+                self.logged_in = False
+                log(
+                    "XQueue put_result failed (try %d of %d): %s: %s"
+                    % (attempt, self.put_attempts, type(e).__name__, e)
+                )
+            if attempt < self.put_attempts:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        log("dropping the result for XQueue submission " + str(message["id"]))
+
+    def close(self):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a warm grading service.")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Pool size for heavy grades (0 grades everything inline)",
+    )
+    parser.add_argument("--heavy-min-bytes", type=int, default=HEAVY_MIN_BYTES)
+    parser.add_argument(
+        "--max-line-bytes",
+        type=int,
+        default=MAX_LINE_BYTES,
+        help="Longest submission line the socket server reads",
+    )
+    sources = parser.add_subparsers(dest="source", required=True)
+
+    from_file = sources.add_parser("file", help="Grade a JSONL file of submissions")
+    from_file.add_argument("input", help="Input .jsonl or .jsonl.gz file, or -")
+    from_file.add_argument("output", help="Output .jsonl or .jsonl.gz file, or -")
+
+    from_socket = sources.add_parser("socket", help="Serve JSON lines over TCP")
+    from_socket.add_argument("--host", default="127.0.0.1")
+    from_socket.add_argument("--port", type=int, default=8765)
+
+    from_xqueue = sources.add_parser("xqueue", help="Poll an XQueue server")
+    from_xqueue.add_argument("--url", required=True)
+    from_xqueue.add_argument("--queue-name", required=True)
+    from_xqueue.add_argument("--user", required=True)
+    from_xqueue.add_argument("--password", required=True)
+    from_xqueue.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    service = GradingService(
+        concurrency=args.concurrency,
+        processes=args.processes,
+        heavy_min_bytes=args.heavy_min_bytes,
+        max_line_bytes=args.max_line_bytes,
+    )
+    started = time.perf_counter()
+    try:
+        if args.source == "socket":
+            asyncio.run(service.serve(args.host, args.port))
+        else:
+            if args.source == "file":
+                queue = FileQueue(args.input, args.output)
+            else:
+                queue = XQueue(
+                    args.url,
+                    args.queue_name,
+                    args.user,
+                    args.password,
+                    args.poll_interval,
+                )
+            try:
+                asyncio.run(service.drain(queue))
+            finally:
+                queue.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        summary = dict(service.stats)
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        sys.stderr.write(json.dumps(summary) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+from collections import Counter
+
+from .boundedCache import ContentCache
+
+#######################################################################
+# Precompiled right answers for matchingAGrader.
+# Each accepted variant of right_answer becomes a set of hashable
+# pairings (for partial credit) and a multiset key (for exact matching),
+# so grading is a handful of set lookups instead of nested loops.
+#######################################################################
+
+matching_cache = ContentCache(max_size=256)
+
+
+# Pairings arrive as JSON lists, which can't go in a set. Lists become
+# tuples; real tuples and dicts are tagged so that nothing compares
+# equal here that wouldn't have compared equal as the original objects.
+def freeze(item):
+    if isinstance(item, list):
+        return tuple(freeze(x) for x in item)
+    if isinstance(item, tuple):
+        return (tuple, tuple(freeze(x) for x in item))
+    if isinstance(item, dict):
+        return (dict, frozenset((k, freeze(v)) for k, v in item.items()))
+    return item
+
+
+def multisetKey(items):
+    return frozenset(Counter(items).items())
+
+
+class MatchingSpec(object):
+    __slots__ = ("targets", "maxpoints", "min_maxpoints_after", "exact_keys")
+
+    def __init__(self, right_answer):
+        self.targets = []
+        self.maxpoints = []
+        self.exact_keys = set()
+        for right_answer_n in right_answer:
+            frozen = [freeze(target) for target in right_answer_n]
+            self.targets.append(frozenset(frozen))
+            self.maxpoints.append(len(right_answer_n))
+            self.exact_keys.add(multisetKey(frozen))
+
+        # Smallest variant size from each position onward. A variant can
+        # never score more than len(answer) / its size, so once the best
+        # score reaches that bound for everything left, we can stop.
+        self.min_maxpoints_after = []
+        smallest = None
+        for points in reversed(self.maxpoints):
+            smallest = points if smallest is None else min(smallest, points)
+            self.min_maxpoints_after.append(smallest)
+        self.min_maxpoints_after.reverse()
+
+    # Returns (currentpoints, maxpoints, wrong_answers, score) for the
+    # first best-scoring variant, the same one matchingAGrader reports.
+    def bestPartial(self, answer):
+        frozen = [freeze(item) for item in answer]
+        number_answers = len(frozen)
+        best = None
+
+        for i, targets in enumerate(self.targets):
+            if best is not None:
+                smallest = self.min_maxpoints_after[i]
+                if smallest > 0 and best[3] >= float(number_answers) / smallest:
+                    break
+
+            currentpoints = 0
+            for item in frozen:
+                if item in targets:
+                    currentpoints += 1
+            wrong_answers = number_answers - currentpoints
+            score = float(currentpoints - wrong_answers) / float(self.maxpoints[i])
+
+            if best is None or score > best[3]:
+                best = (currentpoints, self.maxpoints[i], wrong_answers, score)
+
+        if best is None:
+            raise ValueError("right_answer has no accepted variants.")
+        return best
+
+    def isExactMatch(self, answer):
+        return multisetKey(freeze(item) for item in answer) in self.exact_keys
+
+
+def compileMatching(right_answer, problem_key=None):
+    if isinstance(right_answer, MatchingSpec):
+        return right_answer
+    return matching_cache.compiled(MatchingSpec, (right_answer,), problem_key)
@@ -0,0 +1,154 @@
+import bisect
+
+from . import stringDistance
+
+#######################################################################
+# Scoring for ordering problems.
+# An accepted order is either a string, where each character is one
+# item (the original format), or a list of item ids of any length. We
+# compare the learner's order with each accepted one using a metric:
+#
+#   "levenshtein"  Points are the variant's length minus the edit
+#                  distance. This is the original orderGrader metric.
+#   "lcs"          Points are the length of the longest common
+#                  subsequence: how many items are already in order.
+#   "kendall"      Points are the pairs of items in the right relative
+#                  order, out of every pair in the accepted order.
+#
+# LCS and Kendall take O(n log n) when the accepted order has no
+# repeated items. The best score so far is used to cut off later
+# variants early, so only the first best-scoring variant is fully
+# worked out, which is the same one the original loop would report.
+#######################################################################
+
+METRICS = ("levenshtein", "lcs", "kendall")
+
+
+class OrderVariant(object):
+    __slots__ = ("sequence", "length", "maxpoints", "positions")
+
+    def __init__(self, sequence, metric):
+        if isinstance(sequence, str):
+            self.sequence = sequence.lower()
+        else:
+            self.sequence = tuple(str(item).lower() for item in sequence)
+        self.length = len(self.sequence)
+        if self.length == 0:
+            raise ValueError("orderGrader right answers can't be empty.")
+
+        # Where each item belongs, if no item appears twice.
+        self.positions = None
+        if len(set(self.sequence)) == self.length:
+            self.positions = {item: i for i, item in enumerate(self.sequence)}
+        elif metric == "kendall":
+            raise ValueError("The kendall metric needs every item to be different.")
+
+        if metric == "kendall":
+            self.maxpoints = max(1, self.length * (self.length - 1) // 2)
+        else:
+            self.maxpoints = self.length
+
+
+def longestIncreasing(values):
+    tails = []
+    for v in values:
+        i = bisect.bisect_left(tails, v)
+        if i == len(tails):
+            tails.append(v)
+        else:
+            tails[i] = v
+    return len(tails)
+
+
+def lcsLength(answer, variant):
+    if variant.positions is not None:
+        positions = variant.positions
+        return longestIncreasing(positions[x] for x in answer if x in positions)
+
+    # Repeated items: fall back to the usual dynamic program.
+    previous = [0] * (variant.length + 1)
+    for a in answer:
+        current = [0]
+        for j, v in enumerate(variant.sequence, 1):
+            if a == v:
+                current.append(previous[j - 1] + 1)
+            else:
+                current.append(max(previous[j], current[j - 1]))
+        previous = current
+    return previous[-1]
+
+
+def countInversions(values):
+    if len(values) < 2:
+        return 0, values
+    middle = len(values) // 2
+    left_count, left = countInversions(values[:middle])
+    right_count, right = countInversions(values[middle:])
+    merged = []
+    count = left_count + right_count
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if right[j] < left[i]:
+            merged.append(right[j])
+            count += len(left) - i
+            j += 1
+        else:
+            merged.append(left[i])
+            i += 1
+    merged.extend(left[i:])
+    merged.extend(right[j:])
+    return count, merged
+
+
+def kendallPoints(answer, variant):
+    positions = variant.positions
+    seen = set()
+    placed = []
+    for x in answer:
+        if x in positions and x not in seen:
+            seen.add(x)
+            placed.append(positions[x])
+    if variant.length < 2:
+        return len(placed)
+    pairs = len(placed) * (len(placed) - 1) // 2
+    return pairs - countInversions(placed)[0]
+
+
+# Returns (currentpoints, maxpoints, score) for the first best variant.
+# word is the learner's order as one string, tokens as a tuple of ids.
+def bestOrder(word, tokens, variants, metric, distance=None):
+    distance = distance or stringDistance.levenshtein
+    best = None
+
+    for variant in variants:
+        answer = word if isinstance(variant.sequence, str) else tokens
+
+        if best is not None:
+            # Nothing scores above 1, so a perfect match can't be beaten.
+            if best[2] >= 1:
+                break
+            if metric == "lcs":
+                bound = float(min(len(answer), variant.length)) / variant.maxpoints
+                if bound <= best[2]:
+                    continue
+
+        if metric == "levenshtein":
+            if best is None:
+                lev_dist = distance(answer, variant.sequence)
+            else:
+                # Any distance past this can't beat the best score so far.
+                max_distance = int(variant.length * (1 - best[2])) + 1
+                lev_dist = distance(answer, variant.sequence, max_distance)
+                if lev_dist > max_distance:
+                    continue
+            points = variant.length - lev_dist
+        elif metric == "lcs":
+            points = lcsLength(answer, variant)
+        else:
+            points = kendallPoints(answer, variant)
+
+        score = float(points) / float(variant.maxpoints)
+        if best is None or score > best[2]:
+            best = (points, variant.maxpoints, score)
+
+    return best
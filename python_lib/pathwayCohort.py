@@ -0,0 +1,171 @@
+import itertools
+
+import numpy as np
+
+from . import gradeBrackets
+from . import pathwayIndex
+from . import stateDecoder
+
+#######################################################################
+# Cohort-scale pathway scoring for analytics and regrades.
+# Each learner's ever_opened and currently_open lists become rows of a
+# boolean matrix with one column per choice in the compiled lookup.
+# Every grade_on / retain_negative combination is then scored for the
+# whole cohort with a few array operations, and the numbers match what
+# pathwayGrader returns for each learner one at a time.
+#######################################################################
+
+GRADE_ON_VALUES = ("score", "exploration", "participation")
+RETAIN_NEGATIVE_VALUES = (True, False)
+
+# Status codes used in the "status" arrays, and what they mean to edX.
+STATUS_VALUES = gradeBrackets.STATUS_VALUES
+
+
+class CohortMatrix(object):
+    __slots__ = ("index", "columns", "ever_opened", "currently_open", "open_counts")
+
+    def __init__(self, index, columns, ever_opened, currently_open, open_counts):
+        self.index = index
+        self.columns = columns
+        self.ever_opened = ever_opened
+        self.currently_open = currently_open
+        self.open_counts = open_counts
+
+
+def encodeCohort(points_lookup, learners):
+    index = pathwayIndex.compilePathway(points_lookup)
+    columns = {}
+    for choice in itertools.chain(index.positive, index.negative):
+        columns.setdefault(choice, len(columns))
+
+    ever_rows = []
+    open_rows = []
+    open_counts = []
+    for learner in learners:
+        # Learners can be decoded answers or raw "ans" state strings.
+        if isinstance(learner, (str, bytes)):
+            ever, current = stateDecoder.decodeFields(
+                learner, ("ever_opened", list), ("currently_open", list)
+            )
+        else:
+            ever, current = learner["ever_opened"], learner["currently_open"]
+        ever_rows.append(
+            [columns[c] for c in pathwayIndex.openedSet(ever) if c in columns]
+        )
+        open_rows.append(
+            [columns[c] for c in pathwayIndex.openedSet(current) if c in columns]
+        )
+        # Participation grading counts every entry, matched or not.
+        open_counts.append(len(current))
+
+    return CohortMatrix(
+        index,
+        columns,
+        _toMatrix(ever_rows, len(columns)),
+        _toMatrix(open_rows, len(columns)),
+        np.array(open_counts, dtype=np.int64),
+    )
+
+
+def _toMatrix(rows, width):
+    matrix = np.zeros((len(rows), width), dtype=bool)
+    row_ids = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+    col_ids = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+    matrix[row_ids, col_ids] = True
+    return matrix
+
+
+def _plusPoints(cohort, opened):
+    # Best positive choice in each group, summed over groups.
+    index = cohort.index
+    groups = [[] for _ in range(index.number_groups)]
+    for choice, entries in index.positive.items():
+        for group_number, p in entries:
+            groups[group_number].append((cohort.columns[choice], p))
+
+    plus = np.zeros(opened.shape[0], dtype=np.int64)
+    for entries in groups:
+        if not entries:
+            continue
+        cols = np.array([c for c, p in entries], dtype=np.int64)
+        points = np.array([p for c, p in entries], dtype=np.int64)
+        plus += (opened[:, cols] * points).max(axis=1)
+    return plus
+
+
+def _minusPoints(cohort):
+    negative = np.zeros(len(cohort.columns), dtype=np.int64)
+    for choice, p in cohort.index.negative.items():
+        negative[cohort.columns[choice]] = p
+    return cohort.ever_opened.astype(np.int64) @ negative
+
+
+def _grade(cohort, total_score, grade_on, score_brackets=None):
+    index = cohort.index
+    if grade_on == "score" or grade_on == "exploration":
+        raw_score = total_score.astype(np.float64) / float(index.final_total)
+        grade_decimal = np.minimum(1.0, np.maximum(0.0, raw_score))
+    elif grade_on == "participation":
+        grade_decimal = cohort.open_counts.astype(np.float64) / float(
+            index.number_groups
+        )
+    else:
+        raise ValueError("Unknown grade_on: " + str(grade_on))
+
+    brackets = gradeBrackets.compileBrackets(score_brackets, gradeBrackets.PATHWAY)
+    status, grade_decimal = brackets.scoreArray(grade_decimal)
+    return {
+        "total_score": total_score,
+        "grade_decimal": grade_decimal,
+        "status": status,
+    }
+
+
+def scoreCohort(cohort, grade_on="score", retain_negative=True, score_brackets=None):
+    if grade_on == "exploration":
+        total_score = _plusPoints(cohort, cohort.ever_opened)
+    else:
+        total_score = _plusPoints(cohort, cohort.currently_open)
+    if retain_negative:
+        total_score = total_score + _minusPoints(cohort)
+    return _grade(cohort, total_score, grade_on, score_brackets)
+
+
+# Score every grade_on / retain_negative combination at once.
+# Positive and negative points are each computed only once.
+def scoreAllOptions(cohort, score_brackets=None):
+    current = _plusPoints(cohort, cohort.currently_open)
+    plus = {
+        "score": current,
+        "exploration": _plusPoints(cohort, cohort.ever_opened),
+        "participation": current,
+    }
+    minus = _minusPoints(cohort)
+
+    results = {}
+    for grade_on in GRADE_ON_VALUES:
+        for retain_negative in RETAIN_NEGATIVE_VALUES:
+            total_score = plus[grade_on]
+            if retain_negative:
+                total_score = total_score + minus
+            results[(grade_on, retain_negative)] = _grade(
+                cohort, total_score, grade_on, score_brackets
+            )
+    return results
+
+
+# Turn scored arrays back into the dicts pathwayGrader returns.
+def toResults(cohort, scores, show_points=True):
+    max_score = cohort.index.final_total
+    for total_score, grade_decimal, status in zip(
+        scores["total_score"].tolist(),
+        scores["grade_decimal"].tolist(),
+        scores["status"].tolist(),
+    ):
+        msg = ""
+        if show_points:
+            msg = (
+                "Saved Score: " + str(total_score) + " points out of " + str(max_score)
+            )
+        yield {"ok": STATUS_VALUES[status], "msg": msg, "grade_decimal": grade_decimal}
@@ -0,0 +1,103 @@
+from . import gradeBrackets
+from .boundedCache import ContentCache
+
+#######################################################################
+# Precompiled lookup for pathwayGrader.
+# points_lookup maps group names to {choice: points} dicts, plus a
+# "final_total" entry. Instead of walking every group and choice on
+# each submission, we turn it once into two indexes keyed by choice:
+# the positive points it can earn in each group, and the total negative
+# points it costs. Grading then only touches the choices the learner
+# actually opened.
+#######################################################################
+
+pathway_cache = ContentCache(max_size=256)
+
+
+class PathwayIndex(object):
+    __slots__ = ("final_total", "number_groups", "positive", "negative", "group_max")
+
+    def __init__(self, points_lookup):
+        self.final_total = points_lookup["final_total"]
+        self.number_groups = 0
+        self.positive = {}
+        self.negative = {}
+        self.group_max = []
+
+        for group in points_lookup:
+            if type(points_lookup[group]) is not dict:
+                continue
+            group_number = self.number_groups
+            self.number_groups += 1
+            group_max = 0
+            for choice in points_lookup[group]:
+                p = int(points_lookup[group][choice])
+                key = str(choice)
+                if p > 0:
+                    self.positive.setdefault(key, []).append((group_number, p))
+                    group_max = max(group_max, p)
+                elif p < 0:
+                    self.negative[key] = self.negative.get(key, 0) + p
+            self.group_max.append(group_max)
+
+    # Total points for one learner, the same way pathwayGrader counts them:
+    # the best positive choice from each group, plus every negative choice
+    # ever opened if retain_negative is set.
+    def score(
+        self, ever_opened, currently_open, grade_on="score", retain_negative=True
+    ):
+        ever = openedSet(ever_opened)
+
+        minus_points = 0
+        if retain_negative:
+            for choice in ever:
+                minus_points += self.negative.get(choice, 0)
+
+        if grade_on == "exploration":
+            opened = ever
+        else:
+            opened = openedSet(currently_open)
+
+        best = {}
+        for choice in opened:
+            for group_number, p in self.positive.get(choice, ()):
+                if p > best.get(group_number, 0):
+                    best[group_number] = p
+
+        return sum(best.values()) + minus_points
+
+    # pathwayGrader's scoring rule. options needs grade_on,
+    # retain_negative and score_brackets. Returns (status, grade, points).
+    def grade(self, ever_opened, currently_open, options):
+        total_score = self.score(
+            ever_opened,
+            currently_open,
+            options["grade_on"],
+            options["retain_negative"],
+        )
+
+        if options["grade_on"] == "score" or options["grade_on"] == "exploration":
+            # Make sure we don't go negative or over 100%.
+            raw_score = float(total_score) / float(self.final_total)
+            grade_decimal = min(1.0, max(0.0, raw_score))
+
+        elif options["grade_on"] == "participation":
+            # Grade on how many options they have open instead.
+            grade_decimal = float(len(currently_open)) / float(self.number_groups)
+
+        brackets = gradeBrackets.compileBrackets(
+            options["score_brackets"], gradeBrackets.PATHWAY
+        )
+        isOK, grade_decimal = brackets.score(grade_decimal)
+        return isOK, grade_decimal, total_score
+
+
+# Choices are matched as strings, so anything else in the list can't match.
+def openedSet(opened):
+    return set(c for c in opened if isinstance(c, str))
+
+
+def compilePathway(points_lookup, problem_key=None):
+    if isinstance(points_lookup, PathwayIndex):
+        return points_lookup
+    return pathway_cache.compiled(PathwayIndex, (points_lookup,), problem_key)
@@ -0,0 +1,139 @@
+from . import gradeResult
+
+#######################################################################
+# Cost guards for submitted state.
+# Nothing stops a learner (or a broken page) from sending a megabyte
+# essay, a video log with a hundred thousand heartbeats, or an ordering
+# problem with thousands of items, and any of those can tie up a grading
+# worker for everyone else. Each grader here has a Guard that is checked
+# while its state is decoded, before any grading work starts:
+#
+#   max_bytes    size of the raw state, checked before it is parsed
+#   max_lengths  {field: limit} for list entries or string characters
+#
+# A field over its limit is either rejected (the grader returns a zero
+# grade with a message the learner can act on) or truncated to the
+# limit and graded as usual. An oversized state is always rejected.
+# Every trip is counted in `trips` and reported by graderMetrics.
+#
+# The defaults are far beyond anything a real submission sends. To
+# change one, or to turn guards off:
+#
+#   payloadGuards.setGuard("videoWatchGrader", max_lengths={"watch_times": 200000})
+#   payloadGuards.setGuard("orderGrader", None)
+#   payloadGuards.enabled = False
+#######################################################################
+
+enabled = True
+
+REJECT = "reject"
+TRUNCATE = "truncate"
+
+TOO_LARGE = "Your answer is too large to grade. Please shorten it and try again."
+
+# {(grader, field, action): count}. Byte limits use the field name "ans".
+trips = {}
+
+# Graders that return a bare result rather than an input_list.
+FLAT_RESULTS = frozenset(("pathwayGrader",))
+
+
+class PayloadRejected(ValueError):
+    def __init__(self, grader, field, limit, message):
+        ValueError.__init__(
+            self, grader + " state field '" + field + "' is over " + str(limit)
+        )
+        self.grader = grader
+        self.field = field
+        self.limit = limit
+        self.message = message
+
+
+class Guard(object):
+    __slots__ = ("max_bytes", "max_lengths", "action", "message")
+
+    def __init__(self, max_bytes=None, max_lengths=None, action=REJECT, message=None):
+        if action not in (REJECT, TRUNCATE):
+            raise ValueError("Guard action must be 'reject' or 'truncate'.")
+        self.max_bytes = max_bytes
+        self.max_lengths = dict(max_lengths or {})
+        self.action = action
+        self.message = message or TOO_LARGE
+
+    def checkBytes(self, grader, ans):
+        if self.max_bytes is not None and len(ans) > self.max_bytes:
+            _count(grader, "ans", REJECT)
+            raise PayloadRejected(grader, "ans", self.max_bytes, self.message)
+
+    # Truncated fields keep at least `keep` items, so a grader whose
+    # options ask for more than the limit still sees enough to pass.
+    def checkLength(self, grader, name, value, keep=0):
+        limit = self.max_lengths.get(name)
+        if limit is None or len(value) <= limit:
+            return value
+        if self.action == TRUNCATE:
+            limit = max(limit, int(keep))
+            if len(value) <= limit:
+                return value
+            _count(grader, name, TRUNCATE)
+            return value[:limit]
+        _count(grader, name, self.action)
+        raise PayloadRejected(grader, name, limit, self.message)
+
+
+GUARDS = {
+    "multiTextResponseGrader": Guard(2000000, {"answers": 100}),
+    "journalingResponseGrader": Guard(2000000, {"answer": 100000}, TRUNCATE),
+    "textResponseGrader": Guard(2000000, {"answer": 100000}, TRUNCATE),
+    "pathwayGrader": Guard(1000000, {"ever_opened": 10000, "currently_open": 10000}),
+    "qualtricsSurveyGrader": Guard(65536),
+    "videoWatchGrader": Guard(
+        4000000,
+        {"watch_times": 100000, "watched_intervals": 20000},
+        message="Your viewing record is too long to grade. "
+        "Please contact the course staff.",
+    ),
+    "matchingAGrader": Guard(1000000, {"pairings": 2000}),
+    "orderGrader": Guard(
+        1000000,
+        {"pairings": 500},
+        message="Your answer has too many items to grade. Please try again.",
+    ),
+    "rangeGuessGrader": Guard(65536),
+}
+
+
+def _count(grader, field, action):
+    key = (grader, field, action)
+    trips[key] = trips.get(key, 0) + 1
+
+
+# Pass None to turn a grader's guard off. Otherwise any of Guard's
+# arguments can be given; the ones left out keep their current values.
+def setGuard(grader, guard=False, **kwargs):
+    if guard is None:
+        GUARDS.pop(grader, None)
+        return None
+    if guard is False:
+        old = GUARDS.get(grader) or Guard()
+        settings = {
+            "max_bytes": old.max_bytes,
+            "max_lengths": old.max_lengths,
+            "action": old.action,
+            "message": old.message,
+        }
+        settings.update(kwargs)
+        guard = Guard(**settings)
+    GUARDS[grader] = guard
+    return guard
+
+
+def resetTrips():
+    trips.clear()
+
+
+# What a grader returns in place of grading a rejected payload.
+def rejectedResult(grader, error):
+    return gradeResult.GradeResult(
+        False, 0, gradeResult.TEXT, (error.message,), flat=grader in FLAT_RESULTS
+    )
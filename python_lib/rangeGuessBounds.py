@@ -0,0 +1,208 @@
+import json
+import sys
+
+from .rangeGuessSlider import sliderBounds
+from .rangeGuessSlider import sliderShape
+
+#######################################################################
+# Reproducible slider bounds for range-guessing problems.
+# getRangeGuesserParams pads the slider out past the answer by a random
+# amount, so each page load moves the ends. Given a learner id and a
+# problem id it instead draws those amounts from a hash of the two, and
+# the same learner always sees the same slider on the same problem.
+#
+# The draws are made so they can also be worked out for a whole cohort
+# at once with numpy. writeTable does that for every learner and problem
+# and saves the bounds to a file, and a BoundsTable reads them back with
+# a lookup instead of any arithmetic:
+#
+#   rangeGuessBounds.writeTable("bounds.hxrb", learner_ids, {"q1": options})
+#   table = rangeGuessBounds.BoundsTable("bounds.hxrb")
+#   table.bounds(options, learner_id, "q1")
+#
+# Tables give exactly the same numbers as
+# getRangeGuesserParams(options, learner_id, problem_id). Change the
+# salt to give everyone new sliders (for a new run of a course, say).
+#
+# A seeded page render loads this module, so what only the hashing, the
+# table files or the command line need (hashlib, struct, argparse) is
+# imported where it's used.
+#######################################################################
+
+MASK = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+UNIT = 2.0**-53
+
+MAGIC = b"HXRB1\n"
+BLOCK_ROWS = 65536
+
+
+# splitmix64's finalizer: spreads every input bit over the output.
+def _mix(z):
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+
+def idKey(value, salt=""):
+    import hashlib
+
+    data = (salt + "\x00" + str(value)).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+# Each problem gets one stream for the lower end and one for the upper.
+def _problemStreams(problem_id, salt=""):
+    key = idKey(problem_id, salt)
+    return _mix((key + GOLDEN) & MASK), _mix((key + 2 * GOLDEN) & MASK)
+
+
+def seededDraws(learner_id, problem_id, salt=""):
+    learner_key = idKey(learner_id, salt)
+    lower_stream, upper_stream = _problemStreams(problem_id, salt)
+    return (
+        (_mix(learner_key ^ lower_stream) >> 11) * UNIT,
+        (_mix(learner_key ^ upper_stream) >> 11) * UNIT,
+    )
+
+
+def seededBounds(options, learner_id, problem_id, salt=""):
+    return sliderBounds(options, *seededDraws(learner_id, problem_id, salt))
+
+
+#######################################################################
+# Bulk tables
+#######################################################################
+
+
+def _mixArray(np, z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _drawArray(np, learner_keys, streams):
+    mixed = _mixArray(np, learner_keys[:, None] ^ streams[None, :])
+    return (mixed >> np.uint64(11)).astype(np.float64) * UNIT
+
+
+# Bounds for every learner on every problem, as a (learners, problems, 2)
+# array of [lower, upper]. Needs numpy.
+def buildBounds(learner_ids, problems, salt=""):
+    import numpy as np
+
+    problem_ids = list(problems)
+    streams = [_problemStreams(p, salt) for p in problem_ids]
+    lower_streams = np.array([s[0] for s in streams], dtype=np.uint64)
+    upper_streams = np.array([s[1] for s in streams], dtype=np.uint64)
+    shapes = [sliderShape(problems[p]) for p in problem_ids]
+    low = np.array([s[0] for s in shapes], dtype=np.float64)
+    high = np.array([s[1] for s in shapes], dtype=np.float64)
+    width = np.array([s[2] for s in shapes], dtype=np.float64)
+
+    learner_keys = np.array([idKey(l, salt) for l in learner_ids], dtype=np.uint64)
+    bounds = np.empty((len(learner_keys), len(problem_ids), 2), dtype=np.float64)
+    bounds[:, :, 0] = low - 2 * width * (
+        _drawArray(np, learner_keys, lower_streams) + 1
+    )
+    bounds[:, :, 1] = high + 2 * width * (
+        _drawArray(np, learner_keys, upper_streams) + 1
+    )
+    return bounds
+
+
+# File layout: MAGIC, a 4-byte header length, a JSON header (padded so
+# the numbers start on an 8-byte boundary), then little-endian doubles,
+# [lower, upper] for each learner and problem, learner by learner.
+# Learners are written in blocks so memory stays flat for any cohort.
+def writeTable(path, learner_ids, problems, salt="", block_rows=BLOCK_ROWS):
+    import struct
+
+    learner_ids = [str(l) for l in learner_ids]
+    problems = {str(p): o for p, o in problems.items()}
+    header = json.dumps(
+        {"salt": salt, "problems": list(problems), "learners": learner_ids}
+    ).encode("utf-8")
+    start = len(MAGIC) + 4 + len(header)
+    header += b" " * (-start % 8)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for i in range(0, len(learner_ids), block_rows):
+            block = buildBounds(learner_ids[i : i + block_rows], problems, salt)
+            f.write(block.astype("<f8").tobytes())
+    return len(learner_ids) * len(problems)
+
+
+class BoundsTable(object):
+    def __init__(self, path):
+        import mmap
+        import struct
+
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + " is not a bounds table.")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+            start = f.tell()
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.salt = header["salt"]
+        self.problems = {p: i for i, p in enumerate(header["problems"])}
+        self.learners = {l: i for i, l in enumerate(header["learners"])}
+        self._width = 2 * len(self.problems)
+        if sys.byteorder == "little":
+            self._values = memoryview(self._map)[start:].cast("d")
+        else:
+            from array import array
+
+            self._values = array("d", self._map[start:])
+            self._values.byteswap()
+
+    # {"upper": ..., "lower": ...}, or None if the pair isn't in the table.
+    def lookup(self, learner_id, problem_id):
+        row = self.learners.get(str(learner_id))
+        column = self.problems.get(str(problem_id))
+        if row is None or column is None:
+            return None
+        i = row * self._width + 2 * column
+        return {"upper": self._values[i + 1], "lower": self._values[i]}
+
+    # Falls back to working the bounds out for pairs the table doesn't have.
+    def bounds(self, options, learner_id, problem_id):
+        found = self.lookup(learner_id, problem_id)
+        if found is None:
+            return seededBounds(options, learner_id, problem_id, self.salt)
+        return found
+
+    def close(self):
+        if isinstance(self._values, memoryview):
+            self._values.release()
+        self._map.close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Precompute range-guess slider bounds for a cohort."
+    )
+    parser.add_argument("learners", help="Text file with one learner id per line")
+    parser.add_argument("problems", help="JSON file of {problem id: options}")
+    parser.add_argument("output", help="Bounds table to write")
+    parser.add_argument("--salt", default="")
+    args = parser.parse_args(argv)
+
+    with open(args.learners, encoding="utf-8") as f:
+        learner_ids = [line.strip() for line in f if line.strip()]
+    with open(args.problems, encoding="utf-8") as f:
+        problems = json.load(f)
+    count = writeTable(args.output, learner_ids, problems, args.salt)
+    sys.stderr.write("wrote %d bounds to %s\n" % (count, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import itertools
+
+import numpy as np
+
+from . import gradeBrackets
+from . import graderSpecs
+from . import stateDecoder
+
+#######################################################################
+# Cohort re-scoring and threshold tuning for range-guessing problems.
+# A cohort's guesses become four arrays (lower, upper and the two
+# closed-endpoint flags). Any number of option sets can then be scored
+# against all learners at once, using the same arithmetic as
+# rangeGuessGrader so the grades match it exactly. Learners whose guess
+# would make rangeGuessGrader divide by zero get NaN.
+#
+#   cohort = rangeGuessCohort.encodeCohort(answers)
+#   results = rangeGuessCohort.sweep(cohort, options, tolerance=[...])
+#######################################################################
+
+# Status codes used in the "status" arrays, and what they mean to edX.
+STATUS_VALUES = gradeBrackets.STATUS_VALUES
+
+
+class GuessCohort(object):
+    __slots__ = ("lower", "upper", "lower_closed", "upper_closed")
+
+    def __init__(self, lower, upper, lower_closed, upper_closed):
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        # rangeGuessGrader compares the flags with == True.
+        self.lower_closed = np.array([x == True for x in lower_closed], dtype=bool)
+        self.upper_closed = np.array([x == True for x in upper_closed], dtype=bool)
+
+
+# answers can be decoded answer dicts or raw "ans" state strings.
+def encodeCohort(answers):
+    lower = []
+    upper = []
+    lower_closed = []
+    upper_closed = []
+    for answer in answers:
+        if isinstance(answer, (str, bytes)):
+            answer = stateDecoder.decodeAnswer(answer)
+        lower.append(answer["lowerguess"])
+        upper.append(answer["upperguess"])
+        lower_closed.append(answer["lowerclosed"])
+        upper_closed.append(answer["upperclosed"])
+    return GuessCohort(lower, upper, lower_closed, upper_closed)
+
+
+def _intervalGrades(cohort, spec):
+    lower = cohort.lower
+    upper = cohort.upper
+    low = float(spec.correct_low)
+    high = float(spec.correct_high)
+    no_overlap = (upper < low) | (lower > high)
+
+    endpoints = np.sort(
+        np.stack([np.full_like(lower, low), np.full_like(lower, high), upper, lower]),
+        axis=0,
+    )
+    overlap = endpoints[2] - endpoints[1]
+    bigrange = np.maximum(high - low, upper - lower)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grade = overlap / bigrange
+        grade = np.where(bigrange == 0, np.nan, grade)
+        if spec.interval_tolerance == "strict":
+            grade = grade * grade
+        elif spec.interval_tolerance == "generous":
+            grade = np.sqrt(grade)
+
+    # Round up to the nearest tenth.
+    grade = np.ceil(grade * 10.0) / 10.0
+
+    if spec.show_open_close:
+        penalty = float(spec.type_penalty)
+        grade = grade - penalty * (cohort.lower_closed != spec.lower_closed)
+        grade = grade - penalty * (cohort.upper_closed != spec.upper_closed)
+
+    return np.where(no_overlap, 0.0, grade)
+
+
+def _numberGrades(cohort, spec):
+    correct = float(spec.correct_number)
+    farthest = np.maximum(
+        np.abs(correct - cohort.upper), np.abs(correct - cohort.lower)
+    )
+    return spec.distance_brackets.scoreArray(-farthest)[1]
+
+
+def scoreCohort(cohort, options):
+    spec = graderSpecs.compileRangeGuess(options)
+    if spec.is_interval:
+        grade = _intervalGrades(cohort, spec)
+    else:
+        grade = _numberGrades(cohort, spec)
+    status, grade = spec.score_brackets.scoreArray(grade)
+    return {"grade_decimal": grade, "status": status}
+
+
+def summarize(scores):
+    grade = scores["grade_decimal"]
+    valid = ~np.isnan(grade)
+    values, counts = np.unique(grade[valid], return_counts=True)
+    status_counts = np.bincount(scores["status"][valid], minlength=3)
+    return {
+        "learners": int(grade.size),
+        "errors": int(grade.size - valid.sum()),
+        "mean_grade": float(grade[valid].mean()) if valid.any() else 0.0,
+        "distribution": dict(zip(values.tolist(), counts.tolist())),
+        "ok": int(status_counts[2]),
+        "partial": int(status_counts[1]),
+        "false": int(status_counts[0]),
+    }
+
+
+# Score every combination of the candidate values given as keyword
+# arguments, e.g. sweep(cohort, options, type_penalty=[0, 0.1, 0.2]).
+# Returns a list of (options, summary) pairs.
+def sweep(cohort, base_options, **candidates):
+    names = sorted(candidates)
+    results = []
+    for values in itertools.product(*[candidates[n] for n in names]):
+        options = dict(base_options)
+        options.update(zip(names, values))
+        results.append((options, summarize(scoreCohort(cohort, options))))
+    return results
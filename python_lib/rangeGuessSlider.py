@@ -0,0 +1,24 @@
+#######################################################################
+# Where the slider ends for a range-guessing problem. Both the random
+# bounds in getRangeGuesserParams and the seeded ones in
+# rangeGuessBounds come from here, so they can't drift apart. It
+# imports nothing, so a plain page render stays cheap.
+#######################################################################
+
+
+# (lower centre, upper centre, width) of a problem's answer.
+def sliderShape(options):
+    if options["problem_type"] == "interval":
+        low, high = options["correct_interval"][0], options["correct_interval"][1]
+        return low, high, high - low
+    return options["correct_number"], options["correct_number"], options["tolerance"][2]
+
+
+# The slider reaches past the answer by two to four times its width on
+# each side. lower_draw and upper_draw are in [0, 1).
+def sliderBounds(options, lower_draw, upper_draw):
+    low, high, width = sliderShape(options)
+    return {
+        "upper": high + 2 * width * (upper_draw + 1),
+        "lower": low - 2 * width * (lower_draw + 1),
+    }
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import sqlite3
+
+from . import graderSpecs
+from . import payloadGuards
+from . import stateDecoder
+from .boundedCache import BoundedCache
+
+#######################################################################
+# Content-addressed cache for grading results.
+# Apart from getRangeGuesserParams, every grader is a pure function of
+# (grader, options, payload guard, answer), so regrades and
+# resubmissions can reuse earlier results. The key is a hash of the
+# grader name, its version below, its current payloadGuards settings,
+# the problem options and the decoded answer, so differences in JSON
+# spacing or key order don't matter. States over the guard's byte limit
+# are rejected without being parsed, so they're never cached.
+#
+# There is a bounded in-memory tier and, if you give a path, an SQLite
+# tier that survives between regrade runs:
+#
+#   cache = resultCache.ResultCache(path="regrade_cache.sqlite")
+#   result = cache.grade("orderGrader", ans, right_answer, options)
+#
+# When a grader's behavior changes, bump its number in GRADER_VERSIONS
+# so old results stop matching, and call invalidate() to clear them out.
+#######################################################################
+
+GRADER_VERSIONS = {
+    "multiTextResponseGrader": 2,
+    "journalingResponseGrader": 2,
+    "pathwayGrader": 1,
+    "qualtricsSurveyGrader": 1,
+    "textResponseGrader": 3,
+    "videoWatchGrader": 1,
+    "matchingWithParticipation": 2,
+    "matchingAGrader": 1,
+    "orderGrader": 1,
+    "rangeGuessGrader": 1,
+}
+
+COMMIT_EVERY = 200
+
+
+# Options can hold tuples, sets, non-string dict keys and compiled
+# specs, which plain JSON would mix up with lists and string keys. Each
+# of those is written with its type, so only options that grade the
+# same way share a key. Compiled specs and indexes stand in for the
+# options they came from.
+def _tagged(obj):
+    if obj is None or isinstance(obj, (str, int, float)):
+        return obj
+    if isinstance(obj, list):
+        return ["list", [_tagged(x) for x in obj]]
+    if isinstance(obj, tuple):
+        return ["tuple", [_tagged(x) for x in obj]]
+    if isinstance(obj, dict):
+        items = [[_tagged(k), _tagged(v)] for k, v in obj.items()]
+        return ["dict", sorted(items, key=lambda item: repr(item[0]))]
+    if isinstance(obj, (set, frozenset)):
+        return [type(obj).__name__, sorted((_tagged(x) for x in obj), key=repr)]
+    slots = getattr(type(obj), "__slots__", None)
+    if slots:
+        return [type(obj).__name__, [_tagged(getattr(obj, s, None)) for s in slots]]
+    raise TypeError("Can't build a cache key from " + type(obj).__name__)
+
+
+# None for states the grader's guard rejects before parsing them.
+def resultKey(grader_name, ans, args):
+    if grader_name not in GRADER_VERSIONS:
+        raise ValueError("Grader can't be cached: " + str(grader_name))
+    guard = payloadGuards.GUARDS.get(grader_name) if payloadGuards.enabled else None
+    if guard is not None and guard.max_bytes is not None:
+        if len(ans) > guard.max_bytes:
+            return None
+    text = json.dumps(
+        [
+            grader_name,
+            GRADER_VERSIONS[grader_name],
+            _tagged(guard),
+            _tagged(list(args)),
+            stateDecoder.decodeAnswer(ans),
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, max_size=4096, path=None):
+        self.memory = BoundedCache(max_size=max_size)
+        self.disk_hits = 0
+        self.misses = 0
+        self.path = path
+        self._db = None
+        self._unsaved = 0
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, grader TEXT, version INTEGER, result TEXT)"
+            )
+            self._db.commit()
+
+    def grade(self, grader_name, ans, *args):
+        key = resultKey(grader_name, ans, args)
+        if key is None:
+            self.misses += 1
+            return graderSpecs.compileGrader(grader_name, *args).grade(ans)
+
+        text = self.memory.get(key)
+        if text is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT result FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                text = row[0]
+                self.disk_hits += 1
+                self.memory.set(key, text)
+
+        if text is None:
+            self.misses += 1
+            result = graderSpecs.compileGrader(grader_name, *args).grade(ans)
+            text = json.dumps(result)
+            self.memory.set(key, text)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                    (key, grader_name, GRADER_VERSIONS[grader_name], text),
+                )
+                # Committing every write would be slow for big regrades.
+                self._unsaved += 1
+                if self._unsaved >= COMMIT_EVERY:
+                    self.flush()
+            return result
+
+        # Hand back a fresh copy so callers can't change what's cached.
+        return json.loads(text)
+
+    # Something with a grade(ans) method, like a graderSpecs spec.
+    def bind(self, grader_name, *args):
+        return CachedGrader(self, grader_name, args)
+
+    # Drop stored results from older versions of a grader (or of all of
+    # them). The in-memory tier is simply cleared.
+    def invalidate(self, grader_name=None):
+        self.memory.clear()
+        if self._db is None:
+            return
+        names = [grader_name] if grader_name else list(GRADER_VERSIONS)
+        for name in names:
+            self._db.execute(
+                "DELETE FROM results WHERE grader = ? AND version != ?",
+                (name, GRADER_VERSIONS[name]),
+            )
+        self._db.commit()
+
+    def stats(self):
+        memory = self.memory.stats()
+        lookups = memory["hits"] + self.disk_hits + self.misses
+        return {
+            "memory": memory,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                float(memory["hits"] + self.disk_hits) / lookups if lookups else 0.0
+            ),
+        }
+
+    def flush(self):
+        if self._db is not None:
+            self._db.commit()
+            self._unsaved = 0
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+
+class CachedGrader(object):
+    __slots__ = ("cache", "grader_name", "args")
+
+    def __init__(self, cache, grader_name, args):
+        self.cache = cache
+        self.grader_name = grader_name
+        self.args = tuple(args)
+
+    def grade(self, ans):
+        return self.cache.grade(self.grader_name, ans, *self.args)
@@ -0,0 +1,339 @@
+import argparse
+import inspect
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+from . import batchGrade
+from . import HXGraders
+from . import payloadGuards
+from . import referenceGraders
+from . import stateDecoder
+
+#######################################################################
+# Shadow runs: current graders against the frozen originals.
+# Every grader in HXGraders has to give existing courses exactly what
+# the original code gave them, down to message spacing and rounding.
+# This grades a corpus with both referenceGraders (the originals) and
+# HXGraders, side by side, and reports:
+#
+#   - every call where the two results (or the exceptions raised)
+#     differ, apart from the known, intended differences listed below
+#   - per grader, how the current code's time and peak memory compare
+#     to the original's
+#
+# The corpus is JSONL, one call per line, in the same shape the batch
+# regrader and grading service take:
+#
+#   {"grader": "orderGrader", "args": [["abcd"]], "ans": "..."}
+#
+# "ans" is left out for functions that don't take one (levenshtein,
+# getRangeGuesserParams). Stored submissions can be used as they are;
+# benchmarks/shadowCorpus.py writes a generated one.
+#
+#   python -m python_lib.shadowGrading corpus.jsonl.gz --report shadow.json
+#
+# The exit status is 1 if there were any unexpected differences.
+#######################################################################
+
+GRADERS = (
+    "multiTextResponseGrader",
+    "journalingResponseGrader",
+    "pathwayGrader",
+    "qualtricsSurveyGrader",
+    "textResponseGrader",
+    "videoWatchGrader",
+    "matchingWithParticipation",
+    "matchingAGrader",
+    "levenshtein",
+    "orderGrader",
+    "rangeGuessGrader",
+    "getRangeGuesserParams",
+)
+
+# The original gap between heartbeats that still counts as watching.
+VIDEO_GAP = 3
+
+# Memory is measured on a separate pass over this many calls per grader.
+MEMORY_SAMPLE = 200
+
+
+# The original videoWatchGrader got some watch logs wrong, and the
+# current one deliberately doesn't copy it: heartbeats no more than
+# VIDEO_GAP apart are joined into watched intervals, each interval
+# counts as its end minus its start, and compact "watched_intervals"
+# state is merged in the same way. This works that out separately and
+# scores it with the original's rules, so a difference is only waived
+# when the current result is exactly what the fix should give.
+def _intendedVideoResult(ans, grading):
+    answer = json.loads(json.loads(ans)["answer"])
+    video_length = float(answer["video_length"])
+    spans = [[float(s), float(e)] for s, e in answer.get("watched_intervals", [])]
+    spans += [[t, t] for t in set(float(t) for t in answer.get("watch_times", []))]
+
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start - merged[-1][1] <= VIDEO_GAP:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    grade = sum(end - start for start, end in merged) / video_length
+
+    if grading == "strict":
+        grade = grade * grade
+    elif grading == "generous":
+        grade = math.sqrt(grade)
+    grade = math.ceil(grade * 10.0) / 10.0
+    grade = min(grade, 1.0)
+
+    msg = "You watched about " + str(int(grade * 100)) + " percent of the video."
+    if grade > 0.95:
+        isOK = True
+    elif grade > 0.20:
+        isOK = "Partial"
+    else:
+        isOK = False
+    return {"input_list": [{"ok": isOK, "msg": msg, "grade_decimal": grade}]}
+
+
+# Returns the reason a call is expected to differ, or None.
+def _videoDifference(args, result):
+    try:
+        intended = _intendedVideoResult(*args)
+        state = stateDecoder.decodeAnswer(args[0])
+        times = sorted(set(float(t) for t in state.get("watch_times", [])))
+    except (ValueError, TypeError, AttributeError, KeyError):
+        return None
+    if not _same(intended, result):
+        return None
+    if state.get("watched_intervals"):
+        return "compact interval state"
+    if len(times) <= 2:
+        return "one or two heartbeats"
+    if times[1] - times[0] > VIDEO_GAP:
+        return "first heartbeat stands alone"
+    if times[-1] - times[-2] > VIDEO_GAP:
+        return "final gap over the threshold"
+    return "watch time"
+
+
+INTENDED_DIFFERENCES = {"videoWatchGrader": _videoDifference}
+
+
+def readCorpus(path):
+    f = batchGrade.openText(path, "r")
+    try:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            args = list(record.get("args", []))
+            if "ans" in record:
+                args.insert(0, record["ans"])
+            yield record.get("grader"), tuple(args), record.get("id")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _call(func, args, seed):
+    # getRangeGuesserParams draws from the random module, so both sides
+    # start from the same seed.
+    random.seed(seed)
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+        error = None
+    except Exception as e:
+        result = None
+        error = type(e).__name__
+    return result, error, time.perf_counter() - start
+
+
+def _same(a, b):
+    return json.dumps(a, sort_keys=True, default=repr) == json.dumps(
+        b, sort_keys=True, default=repr
+    )
+
+
+def _newStats():
+    return {
+        "calls": 0,
+        "matches": 0,
+        "intended": 0,
+        "differences": 0,
+        "skipped": 0,
+        "reference_seconds": 0.0,
+        "current_seconds": 0.0,
+    }
+
+
+def _ratio(current, reference):
+    if not reference:
+        return None
+    return round(current / reference, 3)
+
+
+def _peakKiB(func, calls, seed):
+    tracemalloc.start()
+    try:
+        for args in calls:
+            _call(func, args, seed)
+        return tracemalloc.get_traced_memory()[1] / 1024.0
+    finally:
+        tracemalloc.stop()
+
+
+def runShadow(corpus, graders=GRADERS, seed=0, memory=True, max_examples=20):
+    stats = {}
+    examples = []
+    memory_calls = {}
+    unknown = 0
+
+    for index, (name, args, record_id) in enumerate(corpus):
+        if name not in graders:
+            unknown += 1
+            continue
+        s = stats.get(name)
+        if s is None:
+            s = stats[name] = _newStats()
+        s["calls"] += 1
+
+        reference = getattr(referenceGraders, name)
+        current = getattr(HXGraders, name)
+        # Calls using options the original didn't have can't be compared.
+        try:
+            inspect.signature(reference).bind(*args)
+        except TypeError:
+            s["skipped"] += 1
+            continue
+
+        # Alternate which side goes first so neither always runs warm.
+        trips_before = sum(payloadGuards.trips.values())
+        if index % 2:
+            ref_result, ref_error, ref_time = _call(reference, args, seed)
+            cur_result, cur_error, cur_time = _call(current, args, seed)
+        else:
+            cur_result, cur_error, cur_time = _call(current, args, seed)
+            ref_result, ref_error, ref_time = _call(reference, args, seed)
+        s["reference_seconds"] += ref_time
+        s["current_seconds"] += cur_time
+        if memory and len(memory_calls.setdefault(name, [])) < MEMORY_SAMPLE:
+            memory_calls[name].append(args)
+
+        if ref_error or cur_error:
+            same = ref_error == cur_error
+        else:
+            same = _same(ref_result, cur_result)
+        if same:
+            s["matches"] += 1
+            continue
+
+        reason = None
+        if sum(payloadGuards.trips.values()) != trips_before:
+            reason = "payload guard"
+        elif name in INTENDED_DIFFERENCES and not cur_error:
+            reason = INTENDED_DIFFERENCES[name](args, cur_result)
+        if reason is not None:
+            s["intended"] += 1
+            s.setdefault("intended_reasons", {})
+            s["intended_reasons"][reason] = s["intended_reasons"].get(reason, 0) + 1
+            continue
+
+        s["differences"] += 1
+        if len(examples) < max_examples:
+            examples.append(
+                {
+                    "line": index + 1,
+                    "id": record_id,
+                    "grader": name,
+                    "args": args,
+                    "reference": ref_error or ref_result,
+                    "current": cur_error or cur_result,
+                }
+            )
+
+    for name, s in stats.items():
+        s["latency_ratio"] = _ratio(s["current_seconds"], s["reference_seconds"])
+        if name in memory_calls:
+            calls = memory_calls[name]
+            s["reference_peak_kib"] = _peakKiB(
+                getattr(referenceGraders, name), calls, seed
+            )
+            s["current_peak_kib"] = _peakKiB(getattr(HXGraders, name), calls, seed)
+            s["memory_ratio"] = _ratio(s["current_peak_kib"], s["reference_peak_kib"])
+
+    return {
+        "graders": stats,
+        "differences": sum(s["differences"] for s in stats.values()),
+        "unknown_graders": unknown,
+        "examples": examples,
+    }
+
+
+def printReport(report, out=sys.stdout):
+    out.write(
+        "%-28s %7s %7s %8s %6s %7s %9s %9s\n"
+        % ("grader", "calls", "match", "intended", "diff", "skip", "time x", "memory x")
+    )
+    for name, s in sorted(report["graders"].items()):
+        out.write(
+            "%-28s %7d %7d %8d %6d %7d %9s %9s\n"
+            % (
+                name,
+                s["calls"],
+                s["matches"],
+                s["intended"],
+                s["differences"],
+                s["skipped"],
+                s["latency_ratio"],
+                s.get("memory_ratio", "-"),
+            )
+        )
+    for example in report["examples"]:
+        out.write(
+            "\nline %d (%s): %s\n  reference: %s\n  current:   %s\n"
+            % (
+                example["line"],
+                example["id"],
+                example["grader"],
+                json.dumps(example["reference"], default=repr),
+                json.dumps(example["current"], default=repr),
+            )
+        )
+    out.write("\nunexpected differences: %d\n" % report["differences"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Grade a corpus with the original and current graders and compare."
+    )
+    parser.add_argument("corpus", help="Input .jsonl or .jsonl.gz file, or -")
+    parser.add_argument("--report", help="Also write the full report as JSON here")
+    parser.add_argument(
+        "--grader", action="append", choices=GRADERS, help="Only run these graders"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip memory passes")
+    parser.add_argument("--examples", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    report = runShadow(
+        readCorpus(args.corpus),
+        graders=args.grader or GRADERS,
+        seed=args.seed,
+        memory=not args.no_memory,
+        max_examples=args.examples,
+    )
+    printReport(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=repr)
+    return 1 if report["differences"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import json
+import time
+
+from . import payloadGuards
+
+#######################################################################
+# Shared decoding of the problem state ("ans") that every grader gets.
+# The state is double-encoded: a JSON object whose "answer" value is
+# itself a JSON string. This module parses it once per call, pulls out
+# only the fields a grader asks for, and checks their types up front.
+#
+# orjson is used when it is installed, with the standard library as the
+# fallback for anything orjson refuses (NaN, huge integers, etc.), so
+# results and errors match plain json.loads. Importing orjson costs more
+# than decoding a typical small state, so in a cold sandbox it is only
+# loaded once a large payload shows up. Long-running workers should call
+# useFastBackend() at startup.
+#######################################################################
+
+fast_min_bytes = 65536
+backend = "json"
+_fast_loads = None
+
+# The C scanner behind json.loads(). Calling it directly skips two regex
+# whitespace checks and two Python calls per decode, which is most of the
+# cost for a small state. Anything it doesn't take cleanly (whitespace
+# around the value, errors) goes through json.loads() as before.
+_scan_once = json.JSONDecoder().scan_once
+
+
+def useFastBackend():
+    global _fast_loads, backend
+    if _fast_loads is None:
+        try:
+            import orjson
+
+            _fast_loads = orjson.loads
+            backend = "orjson"
+        except ImportError:
+            _fast_loads = False
+    return backend
+
+
+def loads(text):
+    if _fast_loads is None:
+        if len(text) < fast_min_bytes:
+            if type(text) is str:
+                try:
+                    value, end = _scan_once(text, 0)
+                except StopIteration:
+                    return json.loads(text)
+                if end == len(text):
+                    return value
+            return json.loads(text)
+        useFastBackend()
+    if _fast_loads:
+        try:
+            return _fast_loads(text)
+        except Exception:
+            pass
+    return json.loads(text)
+
+
+# Types accepted for numeric fields. Graders call float() on these, so
+# numeric strings are allowed as they always have been.
+NUMBER = (int, float, str)
+
+# Set timing to True to collect decode counts, bytes and seconds.
+timing = False
+stats = {"calls": 0, "bytes": 0, "seconds": 0.0}
+
+
+def resetStats():
+    stats["calls"] = 0
+    stats["bytes"] = 0
+    stats["seconds"] = 0.0
+
+
+def decodeAnswer(ans):
+    if timing:
+        start = time.perf_counter()
+
+    answer = loads(ans)["answer"]
+    if isinstance(answer, (str, bytes)):
+        answer = loads(answer)
+
+    if timing:
+        stats["calls"] += 1
+        stats["bytes"] += len(ans)
+        stats["seconds"] += time.perf_counter() - start
+    return answer
+
+
+# Each field is a (name, types) pair. Use None for types to skip the
+# check. Add a third item, (name, types, default), to make the field
+# optional. Returns the values in the order the fields were given.
+# Give the grader's name to apply its payloadGuards limits, and keep to
+# stop truncated fields from being cut shorter than that.
+def decodeFields(ans, *fields, grader=None, keep=0):
+    guard = payloadGuards.GUARDS.get(grader) if payloadGuards.enabled else None
+    max_lengths = None
+    if guard is not None:
+        guard.checkBytes(grader, ans)
+        max_lengths = guard.max_lengths
+
+    if timing:
+        answer = decodeAnswer(ans)
+    else:
+        # decodeAnswer() without the timing checks, for the common case.
+        answer = loads(ans)["answer"]
+        if isinstance(answer, (str, bytes)):
+            answer = loads(answer)
+
+    values = []
+    for field in fields:
+        if len(field) == 2:
+            name, types = field
+        else:
+            name, types, default = field
+            if name not in answer:
+                values.append(default)
+                continue
+        value = answer[name]
+        if types is not None and not isinstance(value, types):
+            raise TypeError(
+                "State field '" + name + "' has type " + type(value).__name__
+            )
+        if max_lengths and name in max_lengths:
+            value = guard.checkLength(grader, name, value, keep)
+        values.append(value)
+    return values
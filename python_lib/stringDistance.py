@@ -0,0 +1,65 @@
+from .boundedCache import BoundedCache
+
+#######################################################################
+# Edit distance between two sequences (strings, lists or tuples).
+# Iterative, O(len(s) * len(t)) time and O(min(len(s), len(t))) memory.
+# If max_distance is given, we stop as soon as the distance is known
+# to be larger and return max_distance + 1 instead.
+#######################################################################
+
+distance_cache = BoundedCache(max_size=2048)
+
+
+def levenshtein(s, t, max_distance=None):
+    try:
+        key = (s, t, max_distance)
+        result = distance_cache.get(key)
+    except TypeError:
+        # Unhashable input (e.g. a list of items). Skip the cache.
+        return _levenshtein(s, t, max_distance)
+
+    if result is None:
+        result = _levenshtein(s, t, max_distance)
+        distance_cache.set(key, result)
+    return result
+
+
+def _levenshtein(s, t, max_distance=None):
+
+    # Common prefixes and suffixes never cost anything, so drop them.
+    start = 0
+    end_s = len(s)
+    end_t = len(t)
+    while start < end_s and start < end_t and s[start] == t[start]:
+        start += 1
+    while end_s > start and end_t > start and s[end_s - 1] == t[end_t - 1]:
+        end_s -= 1
+        end_t -= 1
+    s = s[start:end_s]
+    t = t[start:end_t]
+
+    # Keep the shorter sequence along the row to save memory.
+    if len(s) < len(t):
+        s, t = t, s
+
+    if max_distance is not None and len(s) - len(t) > max_distance:
+        return max_distance + 1
+    if len(t) == 0:
+        return len(s)
+
+    previous = list(range(len(t) + 1))
+    for i, s_item in enumerate(s, 1):
+        current = [i]
+        for j, t_item in enumerate(t, 1):
+            cost = 0 if s_item == t_item else 1
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            )
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    distance = previous[-1]
+    if max_distance is not None and distance > max_distance:
+        return max_distance + 1
+    return distance
@@ -0,0 +1,98 @@
+#######################################################################
+# Shared length checks for the free-text graders.
+# Essays can be long, and the graders only need to know whether each
+# answer clears a minimum, so nothing here copies the text: lengths are
+# worked out from the ends of the string, and every check stops as soon
+# as the answer is known to pass or fail. Cost depends on the minimums,
+# not on how long the learner's response is.
+#
+# Besides min_length, answers can be held to a minimum number of words
+# or of letters, so a response can't pass on padding like "........"
+# alone. A word is a run of non-whitespace with at least one letter or
+# digit in it, so punctuation on its own, including the quotes trimmed
+# for min_length, isn't a word.
+#######################################################################
+
+_word_pattern = None
+_letter_pattern = None
+
+
+def _patterns():
+    global _word_pattern, _letter_pattern
+    if _word_pattern is None:
+        import re
+
+        # Each match starts at the beginning of a run, so a long run with
+        # no letters or digits is scanned once, not once per character.
+        _word_pattern = re.compile(r"(?<!\S)\S*?[^\W_]\S*")
+        _letter_pattern = re.compile(r"[^\W\d_]")
+    return _word_pattern, _letter_pattern
+
+
+# True if len(text.strip('"').strip()) >= min_length, or len(text) if
+# trim is False, without making either copy. Gives up as soon as more
+# characters have been trimmed than the answer can spare.
+def meetsLength(text, min_length, trim=True):
+    length = len(text)
+    if length < min_length:
+        return False
+    if not trim or min_length <= 0:
+        return True
+
+    spare = length - min_length
+    lo = 0
+    hi = length
+    # Quotes come off the ends first, then whitespace, like the graders'
+    # original strip('"') followed by strip().
+    for trimmed in ('"'.__eq__, str.isspace):
+        while lo < hi and trimmed(text[lo]):
+            lo += 1
+            if lo + length - hi > spare:
+                return False
+        while hi > lo and trimmed(text[hi - 1]):
+            hi -= 1
+            if lo + length - hi > spare:
+                return False
+    return True
+
+
+def _hasAtLeast(pattern, text, count):
+    if count <= 0:
+        return True
+    for found, _ in enumerate(pattern.finditer(text), 1):
+        if found >= count:
+            return True
+    return False
+
+
+def meetsMinimums(text, min_length=0, min_words=0, min_letters=0, trim=True):
+    if not meetsLength(text, min_length, trim):
+        return False
+    if min_words <= 0 and min_letters <= 0:
+        return True
+    words, letters = _patterns()
+    return _hasAtLeast(words, text, min_words) and _hasAtLeast(
+        letters, text, min_letters
+    )
+
+
+# Checks a list of answers in one pass. Returns None if they pass,
+# "blank" if fill_all is set and one is empty, or "short" otherwise.
+# With fill_all, every answer has to meet the minimums; without it, one
+# is enough.
+def checkAnswers(answers, min_length=0, fill_all=False, min_words=0, min_letters=0):
+    if fill_all:
+        short = False
+        for a in answers:
+            if len(a) == 0:
+                return "blank"
+            if not short and not meetsMinimums(
+                a, min_length, min_words, min_letters, trim=False
+            ):
+                short = True
+        return "short" if short else None
+
+    for a in answers:
+        if meetsMinimums(a, min_length, min_words, min_letters, trim=False):
+            return None
+    return "short"
@@ -0,0 +1,484 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import zlib
+
+from . import batchGrade
+from . import gradeResult
+from . import pathwayIndex
+from . import stateDecoder
+from . import watchIntervals
+
+#######################################################################
+# Course-wide video and pathway grades from edX tracking logs.
+# Instead of grading each learner's saved problem state, this reads the
+# raw tracking logs (JSONL, usually gzipped), picks out the video and
+# pathway events for the items listed in a config file, and grades
+# every learner with the same rules videoWatchGrader and pathwayGrader
+# use.
+#
+# It runs in two passes, both spread over a process pool:
+#
+#   1. Log lines are read in chunks, parsed, and the events we care
+#      about are written to one spill file per shard, picked by a hash
+#      of the learner. Only a few chunks are in memory at a time.
+#   2. Each shard is replayed in one worker, which keeps every learner's
+#      watched intervals and opened-choice bitsets, grades them, and
+#      writes one line per learner.
+#
+# Give the log files oldest first: play and pause events are paired up
+# in the order they're read.
+#
+#   python -m python_lib.trackingLogs config.json grades.jsonl logs/*.gz
+#
+# The config is JSON:
+#
+#   {
+#     "videos": {"<video id>": {"length": 300, "grading": "normal"}},
+#     "pathways": {"<problem id>": {"points_lookup": {...}, "options": {}}}
+#   }
+#
+# Videos can also set gap_threshold and score_brackets; without a
+# length we use the longest "duration" the player reported. Pathways
+# take the same options as pathwayGrader. Set "learner_field" to group
+# by something other than "username", and "event_types" to change any
+# of the event names in EVENT_TYPES.
+#######################################################################
+
+EVENT_TYPES = {
+    "video_play": ["play_video", "edx.video.played"],
+    "video_stop": [
+        "pause_video",
+        "stop_video",
+        "edx.video.paused",
+        "edx.video.stopped",
+        "edx.video.completed",
+    ],
+    "video_seek": ["seek_video", "edx.video.position.changed"],
+    # Sent by HX's video problems every few seconds while playing.
+    "video_heartbeat": ["hx.video.heartbeat"],
+    "pathway_open": ["hx.pathway.opened"],
+    "pathway_close": ["hx.pathway.closed"],
+}
+
+# Event codes in the spill files.
+PLAY, STOP, SEEK, HEARTBEAT, OPEN, CLOSE = range(6)
+
+VIDEO_CODES = {
+    "video_play": PLAY,
+    "video_stop": STOP,
+    "video_seek": SEEK,
+    "video_heartbeat": HEARTBEAT,
+}
+PATHWAY_CODES = {"pathway_open": OPEN, "pathway_close": CLOSE}
+
+PATHWAY_DEFAULTS = {
+    "show_points": True,
+    "grade_on": "score",
+    "retain_negative": True,
+    "score_brackets": None,
+}
+
+# Fold raw segments and heartbeats into merged intervals this often.
+FOLD_EVERY = 256
+
+
+def loadConfig(path_or_dict):
+    if isinstance(path_or_dict, dict):
+        config = dict(path_or_dict)
+    else:
+        with open(path_or_dict, encoding="utf-8") as f:
+            config = json.load(f)
+    config.setdefault("videos", {})
+    config.setdefault("pathways", {})
+    config.setdefault("learner_field", "username")
+    event_types = dict(EVENT_TYPES)
+    event_types.update(config.get("event_types") or {})
+    config["event_types"] = event_types
+    return config
+
+
+def learnerShard(learner, shards):
+    # crc32 rather than hash() so every process agrees.
+    return zlib.crc32(learner.encode("utf-8")) % shards
+
+
+#######################################################################
+# Pass 1: parse and partition.
+#######################################################################
+
+
+def _eventCodes(config):
+    codes = {}
+    for name, code in list(VIDEO_CODES.items()) + list(PATHWAY_CODES.items()):
+        for event_type in config["event_types"][name]:
+            codes[event_type] = code
+    return codes
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Events of a type we read that can't be used, such as a list where the
+# problem or video id should be. They're counted and skipped.
+MALFORMED = "malformed"
+
+
+# Returns (learner, item, code, a, b), None for lines we don't need, or
+# MALFORMED.
+def extractEvent(record, config, codes):
+    event_type = record.get("event_type")
+    if not isinstance(event_type, str):
+        return None
+    code = codes.get(event_type)
+    if code is None:
+        return None
+
+    learner = record.get(config["learner_field"])
+    if not learner:
+        context = record.get("context")
+        learner = context.get("user_id") if isinstance(context, dict) else None
+    if not learner:
+        return None
+
+    event = record.get("event")
+    if isinstance(event, str):
+        try:
+            event = stateDecoder.loads(event)
+        except ValueError:
+            return MALFORMED
+    if not isinstance(event, dict):
+        return MALFORMED
+
+    if code in (OPEN, CLOSE):
+        problem = event.get("problem")
+        if not isinstance(problem, str):
+            return MALFORMED
+        if problem not in config["pathways"]:
+            return None
+        if not isinstance(event.get("choice"), str):
+            return MALFORMED
+        return (str(learner), problem, code, event["choice"], None)
+
+    video = event.get("id")
+    if not isinstance(video, str):
+        return MALFORMED
+    if video not in config["videos"]:
+        return None
+    if code == SEEK:
+        a = _number(event.get("old_time"))
+        b = _number(event.get("new_time"))
+    else:
+        a = _number(event.get("currentTime"))
+        b = _number(event.get("duration"))
+    return (str(learner), video, code, a, b)
+
+
+# Returns the events split by shard, and how many were malformed.
+def extractChunk(lines, config, shards):
+    stateDecoder.useFastBackend()
+    codes = _eventCodes(config)
+    event_types = tuple(codes)
+    by_shard = [[] for _ in range(shards)]
+    malformed = 0
+    for line in lines:
+        # Most log lines are for other events; skip them before parsing.
+        if not any(t in line for t in event_types):
+            continue
+        try:
+            record = stateDecoder.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        event = extractEvent(record, config, codes)
+        if event is MALFORMED:
+            malformed += 1
+        elif event is not None:
+            by_shard[learnerShard(event[0], shards)].append(event)
+    return by_shard, malformed
+
+
+def readLines(paths):
+    for path in paths:
+        f = batchGrade.openText(path, "r")
+        try:
+            for line in f:
+                yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+#######################################################################
+# Pass 2: replay each shard and grade.
+#######################################################################
+
+
+class VideoTrack(object):
+    __slots__ = ("intervals", "heartbeats", "playing_from", "duration")
+
+    def __init__(self):
+        self.intervals = []
+        self.heartbeats = []
+        self.playing_from = None
+        self.duration = None
+
+    def add(self, code, a, b, gap_threshold):
+        if code == PLAY:
+            self.playing_from = a
+        elif code == STOP:
+            self._close(a)
+        elif code == SEEK:
+            if self.playing_from is not None:
+                self._close(a)
+                self.playing_from = b
+        else:
+            if a is not None:
+                self.heartbeats.append(a)
+        if code != SEEK and b is not None:
+            self.duration = b if self.duration is None else max(self.duration, b)
+        if len(self.intervals) + len(self.heartbeats) > FOLD_EVERY:
+            self.intervals = self.watched(gap_threshold)
+            self.heartbeats = []
+
+    def _close(self, position):
+        start = self.playing_from
+        self.playing_from = None
+        if start is not None and position is not None and position >= start:
+            self.intervals.append([start, position])
+
+    def watched(self, gap_threshold):
+        return watchIntervals.foldWatchTimes(
+            self.intervals, self.heartbeats, gap_threshold
+        )
+
+
+# Choices are kept as bits, numbered per problem in the order they're
+# first seen.
+class PathwayTrack(object):
+    __slots__ = ("ever_opened", "currently_open")
+
+    def __init__(self):
+        self.ever_opened = 0
+        self.currently_open = 0
+
+
+def _bits(mask, names):
+    return [names[i] for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def gradeVideo(track, settings):
+    length = settings.get("length") or track.duration
+    if not length:
+        return {"error": "Video length is unknown."}
+    gap_threshold = settings.get("gap_threshold", watchIntervals.DEFAULT_GAP_THRESHOLD)
+    intervals = track.watched(gap_threshold)
+    isOK, grade, percent = watchIntervals.watchGrade(
+        watchIntervals.totalWatchTime(intervals),
+        float(length),
+        settings.get("grading", "normal"),
+        settings.get("score_brackets"),
+    )
+    return gradeResult.GradeResult(
+        isOK, grade, gradeResult.VIDEO_WATCHED, (percent,)
+    ).toEdX()
+
+
+def gradePathway(index, options, ever_opened, currently_open):
+    isOK, grade, total_score = index.grade(ever_opened, currently_open, options)
+    if options["show_points"]:
+        result = gradeResult.GradeResult(
+            isOK,
+            grade,
+            gradeResult.PATHWAY_SCORE,
+            (total_score, index.final_total),
+            flat=True,
+        )
+    else:
+        result = gradeResult.GradeResult(isOK, grade, flat=True)
+    return result.toEdX()
+
+
+def readSpill(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                events = pickle.load(f)
+            except EOFError:
+                return
+            for event in events:
+                yield event
+
+
+def aggregateShard(spill_path, config, out_path):
+    videos = config["videos"]
+    pathways = config["pathways"]
+    gaps = {
+        v: s.get("gap_threshold", watchIntervals.DEFAULT_GAP_THRESHOLD)
+        for v, s in videos.items()
+    }
+    video_tracks = collections.defaultdict(dict)
+    pathway_tracks = collections.defaultdict(dict)
+    choice_bits = {p: {} for p in pathways}
+
+    for learner, item, code, a, b in readSpill(spill_path):
+        if code in (OPEN, CLOSE):
+            bits = choice_bits[item]
+            bit = bits.get(a)
+            if bit is None:
+                bit = bits[a] = len(bits)
+            track = pathway_tracks[learner].get(item)
+            if track is None:
+                track = pathway_tracks[learner][item] = PathwayTrack()
+            if code == OPEN:
+                track.ever_opened |= 1 << bit
+                track.currently_open |= 1 << bit
+            else:
+                track.currently_open &= ~(1 << bit)
+        else:
+            track = video_tracks[learner].get(item)
+            if track is None:
+                track = video_tracks[learner][item] = VideoTrack()
+            track.add(code, a, b, gaps[item])
+
+    indexes = {}
+    options = {}
+    names = {}
+    for problem, settings in pathways.items():
+        indexes[problem] = pathwayIndex.compilePathway(settings["points_lookup"])
+        options[problem] = dict(PATHWAY_DEFAULTS)
+        options[problem].update(settings.get("options") or {})
+        bits = choice_bits[problem]
+        names[problem] = sorted(bits, key=bits.get)
+
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for learner in sorted(set(video_tracks) | set(pathway_tracks)):
+            line = {"learner": learner, "videos": {}, "pathways": {}}
+            for video, track in sorted(video_tracks.get(learner, {}).items()):
+                line["videos"][video] = gradeVideo(track, videos[video])
+            for problem, track in sorted(pathway_tracks.get(learner, {}).items()):
+                line["pathways"][problem] = gradePathway(
+                    indexes[problem],
+                    options[problem],
+                    _bits(track.ever_opened, names[problem]),
+                    _bits(track.currently_open, names[problem]),
+                )
+            out.write(json.dumps(line) + "\n")
+            count += 1
+    return count
+
+
+#######################################################################
+# Driver
+#######################################################################
+
+
+def aggregateLogs(
+    log_paths,
+    config,
+    out_path,
+    processes=None,
+    shards=None,
+    chunk_size=20000,
+    work_dir=None,
+):
+    config = loadConfig(config)
+    processes = processes or os.cpu_count() or 1
+    shards = shards or processes
+    spill_dir = tempfile.mkdtemp(prefix="hx-tracking-", dir=work_dir)
+    summary = {"lines": 0, "events": 0, "malformed": 0, "learners": 0}
+
+    try:
+        spill_paths = [
+            os.path.join(spill_dir, "shard-%d.pickle" % i) for i in range(shards)
+        ]
+        spills = [open(p, "wb") for p in spill_paths]
+
+        def spill(extracted):
+            by_shard, malformed = extracted
+            summary["malformed"] += malformed
+            for f, events in zip(spills, by_shard):
+                if events:
+                    pickle.dump(events, f, pickle.HIGHEST_PROTOCOL)
+                    summary["events"] += len(events)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+            try:
+                pending = collections.deque()
+                for chunk in batchGrade.chunked(readLines(log_paths), chunk_size):
+                    summary["lines"] += len(chunk)
+                    pending.append(pool.submit(extractChunk, chunk, config, shards))
+                    # Backpressure: wait on the oldest chunk before reading more.
+                    if len(pending) >= processes * 2:
+                        spill(pending.popleft().result())
+                while pending:
+                    spill(pending.popleft().result())
+            finally:
+                for f in spills:
+                    f.close()
+
+            part_paths = [p + ".out" for p in spill_paths]
+            parts = [
+                pool.submit(aggregateShard, spill_path, config, part_path)
+                for spill_path, part_path in zip(spill_paths, part_paths)
+            ]
+            # Each shard's grades are copied out as soon as it's done.
+            out = batchGrade.openText(out_path, "w")
+            try:
+                for part, part_path in zip(parts, part_paths):
+                    summary["learners"] += part.result()
+                    with open(part_path, encoding="utf-8") as f:
+                        shutil.copyfileobj(f, out)
+                    os.remove(part_path)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+                else:
+                    out.flush()
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Grade video watching and pathway exploration from tracking logs."
+    )
+    parser.add_argument("config", help="JSON file listing the videos and pathways")
+    parser.add_argument("output", help="Output .jsonl or .jsonl.gz file, or -")
+    parser.add_argument("logs", nargs="+", help="Tracking log files, oldest first")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument(
+        "--shards", type=int, default=None, help="Learner shards (default: processes)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--work-dir", default=None, help="Where to put spill files")
+    args = parser.parse_args(argv)
+
+    summary = aggregateLogs(
+        args.logs,
+        args.config,
+        args.output,
+        processes=args.processes,
+        shards=args.shards,
+        chunk_size=args.chunk_size,
+        work_dir=args.work_dir,
+    )
+    sys.stderr.write(json.dumps(summary) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
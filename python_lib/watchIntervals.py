@@ -0,0 +1,94 @@
+import math
+
+from . import gradeBrackets
+
+#######################################################################
+# Watch-time bookkeeping for video problems.
+# The video player sends a list of heartbeat timestamps (in seconds).
+# We sort them once and sweep through in a single pass, joining any
+# two heartbeats that are no more than gap_threshold seconds apart into
+# one watched interval. Each interval counts as (end - start) seconds.
+#######################################################################
+
+DEFAULT_GAP_THRESHOLD = 3
+
+
+def mergeWatchTimes(watch_times, gap_threshold=DEFAULT_GAP_THRESHOLD):
+    times = sorted(set(float(t) for t in watch_times))
+    intervals = []
+    if not times:
+        return intervals
+
+    start = end = times[0]
+    for t in times[1:]:
+        if t - end > gap_threshold:
+            intervals.append([start, end])
+            start = t
+        end = t
+    intervals.append([start, end])
+    return intervals
+
+
+def totalWatchTime(intervals):
+    return sum(end - start for start, end in intervals)
+
+
+# videoWatchGrader's scoring rule, shared with anything else that has
+# watch times to grade. Returns (status, grade, percent watched).
+def watchGrade(total_watch_time, video_length, grading, score_brackets=None):
+    grade = total_watch_time / video_length
+
+    if grading == "strict":
+        grade = grade * grade
+    elif grading == "generous":
+        grade = math.sqrt(grade)
+
+    # Round up to the nearest tenth.
+    grade = math.ceil(grade * 10.0) / 10.0
+    grade = min(grade, 1.0)
+
+    percent = int(grade * 100)
+
+    brackets = gradeBrackets.compileBrackets(score_brackets, gradeBrackets.VIDEO_WATCH)
+    isOK, grade = brackets.score(grade)
+    return isOK, grade, percent
+
+
+#######################################################################
+# Compact watch state.
+# Instead of sending every heartbeat it has ever seen, the player can
+# keep a short list of [start, end] watched intervals and send that as
+# "watched_intervals". New heartbeats are folded into the existing
+# intervals, so the stored state only grows when the learner skips
+# around, not with every second watched. Folding is order-independent:
+# folding batches one at a time gives the same result as merging all
+# of the heartbeats at once.
+#######################################################################
+
+
+def mergeIntervals(intervals, gap_threshold=DEFAULT_GAP_THRESHOLD):
+    merged = []
+    for start, end in sorted([float(s), float(e)] for s, e in intervals):
+        if merged and start - merged[-1][1] <= gap_threshold:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def foldWatchTimes(intervals, watch_times, gap_threshold=DEFAULT_GAP_THRESHOLD):
+    new_intervals = mergeWatchTimes(watch_times, gap_threshold)
+    if not intervals:
+        return new_intervals
+    return mergeIntervals(list(intervals) + new_intervals, gap_threshold)
+
+
+def updateWatchState(state, watch_times, gap_threshold=DEFAULT_GAP_THRESHOLD):
+    new_state = dict(state)
+    new_state.pop("watch_times", None)
+    new_state["watched_intervals"] = foldWatchTimes(
+        state.get("watched_intervals", []),
+        list(state.get("watch_times", [])) + list(watch_times),
+        gap_threshold,
+    )
+    return new_state